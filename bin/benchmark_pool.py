@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Script to measure the cost of sending athlete profiles to sub processes.
+
+Compares sending the profiles with every LENEX file, as make_database.py
+used to do, with sending them once to each sub process. The tasks are
+created from the LENEX files the same way make_database.py creates them.
+
+"""
+
+# Standard imports
+import sys
+import os
+import argparse
+import pickle
+import time
+import multiprocessing
+from collections import defaultdict
+
+# Try to create a working PYTHONPATH
+_BIN_DIRECTORY = os.path.dirname(os.path.realpath(__file__))
+_ROOT_DIRECTORY = os.path.abspath(os.path.join(_BIN_DIRECTORY, os.pardir))
+if _BIN_DIRECTORY.endswith('/fina/bin') is True:
+    sys.path.append(_ROOT_DIRECTORY)
+else:
+    print(
+        'This script is not installed in the "fina/bin" directory. '
+        'Please fix.')
+    sys.exit(2)
+
+# Fina imports
+from fina import athletes
+from fina import identity
+from fina import log
+import make_database
+
+
+def _nested(profiles):
+    """Convert profiles to the nested defaultdict previously used.
+
+    Args:
+        profiles: Dict of profiles keyed by lastname, firstname, birthdate
+
+    Returns:
+        data: Nested defaultdict of profiles
+
+    """
+    # Initialize key variables
+    data = defaultdict(
+        lambda: defaultdict(lambda: defaultdict()))
+
+    for lastname, firstnames in profiles.items():
+        for firstname, birthdates in firstnames.items():
+            for birthdate, values in birthdates.items():
+                data[lastname][firstname][birthdate] = values
+    return data
+
+
+def _serialize(dumps, arguments, repeat):
+    """Serialize a list of task arguments.
+
+    Args:
+        dumps: Serialization function
+        arguments: List of task arguments
+        repeat: Number of times to repeat the measurement
+
+    Returns:
+        result: Tuple of (total bytes, best duration in seconds)
+
+    """
+    # Initialize key variables
+    durations = []
+    size = 0
+
+    for _ in range(repeat):
+        size = 0
+        ts_start = time.perf_counter()
+        for argument in arguments:
+            size += len(dumps(argument))
+        durations.append(time.perf_counter() - ts_start)
+
+    result = (size, min(durations))
+    return result
+
+
+def _report(label, tasks, size, duration):
+    """Print the results of a measurement.
+
+    Args:
+        label: Description of the measurement
+        tasks: Number of tasks
+        size: Total bytes serialized
+        duration: Duration in seconds
+
+    Returns:
+        None
+
+    """
+    print(
+        '{:<32} total {:>12,} bytes {:>9.3f}s   '
+        'per task {:>10,} bytes {:>9.6f}s'
+        ''.format(
+            label, size, duration,
+            size // tasks, duration / tasks))
+
+
+def main():
+    """Main Function.
+
+    Measure serialization overhead
+
+    """
+    # Get CLI arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '-p', '--profile_directory',
+        help='Name of directory with athlete profiles.',
+        type=str, required=True)
+    parser.add_argument(
+        '-l', '--lenex_directory',
+        help='Name of directory with LENEX XML files.',
+        type=str, required=True)
+    parser.add_argument(
+        '-s', '--stream',
+        help='Measure tasks that read LENEX files incrementally.',
+        action='store_true')
+    parser.add_argument(
+        '-c', '--cache_directory',
+        help='Name of the cache directory given to make_database.py.',
+        type=str, default=None)
+    parser.add_argument(
+        '-m', '--match',
+        help='Minimum confidence of inexact matches given to '
+        'make_database.py. The resolver is sent with the profiles if used.',
+        type=float, default=None)
+    parser.add_argument(
+        '-r', '--repeat',
+        help='Number of times to repeat each measurement.',
+        type=int, default=3)
+    args = parser.parse_args()
+    processes = max(multiprocessing.cpu_count() - 1, 1)
+
+    # Get the profiles and the tasks of make_database.py
+    profiles = athletes.read(args.profile_directory)
+    if args.match is None:
+        resolver = None
+    else:
+        resolver = identity.Resolver(profiles, threshold=args.match)
+    arguments = make_database._lenex_arguments(
+        make_database._lenex_filenames(args.lenex_directory),
+        stream=args.stream, cache_directory=args.cache_directory)
+    tasks = len(arguments)
+    if bool(tasks) is False:
+        log_message = 'No LENEX files in {}'.format(args.lenex_directory)
+        log.log2die(1005, log_message)
+
+    # Profiles sent with every task. This requires dill
+    try:
+        import dill
+    except ImportError:
+        print('dill is not installed. Skipping per task measurement.')
+    else:
+        nested = _nested(profiles)
+        (size, duration) = _serialize(
+            dill.dumps,
+            [(argument[0], nested) + argument[1:] for argument in arguments],
+            args.repeat)
+        _report('Profiles per task (dill)', tasks, size, duration)
+
+    # Profiles sent once per process
+    (once_size, once_duration) = _serialize(
+        pickle.dumps, [(profiles, resolver)] * processes, args.repeat)
+    (size, duration) = _serialize(pickle.dumps, arguments, args.repeat)
+    _report(
+        'Profiles per process (pickle)', tasks,
+        size + once_size, duration + once_duration)
+    print('Processes: {}, Tasks: {}'.format(processes, tasks))
+
+
+if __name__ == '__main__':
+    main()
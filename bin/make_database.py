@@ -9,17 +9,12 @@ The final data is stored in a database CSV file.
 import sys
 import os
 import argparse
-import csv
 import re
 import time
-from collections import defaultdict
-import pathos.multiprocessing as multiprocessing
+import multiprocessing
+from functools import partial
 from pprint import pprint
 
-# pip3 imports
-import yaml
-
-
 # Try to create a working PYTHONPATH
 _BIN_DIRECTORY = os.path.dirname(os.path.realpath(__file__))
 _ROOT_DIRECTORY = os.path.abspath(os.path.join(_BIN_DIRECTORY, os.pardir))
@@ -33,74 +28,33 @@ else:
 
 # Fina imports
 from fina import results
+from fina import table
+from fina import cache
+from fina import manifest
+from fina import store
+from fina import athletes
+from fina import identity
 
+# Athlete profiles and identity.Resolver of a worker process. Set once by
+# _lenex_initializer
+_PROFILES = None
+_RESOLVER = None
 
-def _read_profiles(profile_directory):
-    """Function to read profile files.
 
-    Args:
-        directory: Name of directory containing data
-
-    Returns:
-        profiles: Dict of profiles keyed by lastname, firstname
-
-    """
-    # Initialize key variables
-    profiles = defaultdict(
-        lambda: defaultdict(lambda: defaultdict()))
-
-    # Read the yaml files in the profiles directory
-    files = os.listdir(profile_directory)
-    filenames = ['{}{}{}'.format(
-        profile_directory, os.sep, nextfile) for nextfile in files]
-
-    for _filename in sorted(filenames):
-        # Get rid of excess os.sep separators
-        pathitems = _filename.split(os.sep)
-        filename = os.sep.join(pathitems)
-
-        # Skip obvious
-        if os.path.isfile(filename) is False:
-            continue
-        if filename.lower().endswith('.yaml') is False:
-            continue
-
-        with open(filename, 'r') as stream:
-            try:
-                _profiles = yaml.load(stream)['data']
-            except yaml.YAMLError as exc:
-                print(exc)
-
-    # Create dictionary
-    for item in _profiles:
-        firstname = item['firstname']
-        lastname = item['lastname']
-        height = item['height']
-        weight = item['weight']
-        birthdate = item['birthdate']
-        profiles[lastname][firstname][birthdate] = {
-            'height': height, 'weight': weight}
-
-    return profiles
-
-
-def _lenex(lenex_directory, profiles):
-    """Process Fina result files.
+def _lenex_filenames(lenex_directory):
+    """Get the names of Fina result files.
 
     Args:
         lenex_directory: Name of directory containing data
-        _profiles: Dict of swimmer profiles for height / weight lookup
 
     Returns:
-        alldata: List of list of data
+        all_filenames: List of filenames
 
     """
     # Initialize key variables
-    alldata = []
     data_directories = []
     regex = re.compile(r'^.*?(\/\d{4})$')
     all_filenames = []
-    arguments = []
 
     # Recursively get filenames under directory
     for root, subdirectories, _ in os.walk(lenex_directory):
@@ -130,58 +84,192 @@ def _lenex(lenex_directory, profiles):
             # Create a list of valid filenames
             all_filenames.append(filename)
 
+    return all_filenames
+
+
+def _lenex(
+        all_filenames, profiles, stream=False, cache_directory=None,
+        resolver=None):
+    """Process Fina result files.
+
+    Args:
+        all_filenames: List of LENEX files
+        profiles: Dict of swimmer profiles for height / weight lookup
+        stream: Read files incrementally to limit memory usage if True
+        cache_directory: Directory for cached results. None disables caching
+        resolver: identity.Resolver object for inexact name matches. None
+            if only exact matches are used
+
+    Returns:
+        all_results: List of Table objects for each file
+
+    """
+    # Nothing to do
+    if bool(all_filenames) is False:
+        return []
+
     # Create sub processes argument list
-    for next_filename in all_filenames:
-        arguments.append((next_filename, profiles))
+    arguments = _lenex_arguments(
+        all_filenames, stream=stream, cache_directory=cache_directory)
 
     # Create subprocesses to do the job
-    processes = multiprocessing.cpu_count() - 1
-    with multiprocessing.Pool(processes=processes) as pool:
+    processes = max(multiprocessing.cpu_count() - 1, 1)
+    with multiprocessing.Pool(
+            processes=processes, initializer=_lenex_initializer,
+            initargs=(profiles, resolver)) as pool:
         all_results = pool.starmap(_lenex_sub_process, arguments)
 
-    # Get XML filenames
-    for meet_results in all_results:
-        for item in meet_results:
-            alldata.append(item)
+    return all_results
 
-    return alldata
 
+def _lenex_arguments(all_filenames, stream=False, cache_directory=None):
+    """Create the arguments of the sub process of each LENEX file.
 
-def _lenex_sub_process(filename, profiles):
-    """Process Fina result files.
+    Args:
+        all_filenames: List of LENEX files
+        stream: Read files incrementally to limit memory usage if True
+        cache_directory: Directory for cached results. None disables caching
+
+    Returns:
+        arguments: List of argument tuples for _lenex_sub_process
+
+    """
+    # Profiles are too large to send with every file, they are sent to
+    # each process once by _lenex_initializer instead
+    arguments = [
+        (next_filename, stream, cache_directory)
+        for next_filename in all_filenames]
+    return arguments
+
+
+def _lenex_initializer(profiles, resolver):
+    """Store athlete profiles once in each sub process.
 
     Args:
-        lenex_directory: Name of directory containing data
         profiles: Dict of swimmer profiles for height / weight lookup
+        resolver: identity.Resolver object for inexact name matches
+
+    Returns:
+        None
+
+    """
+    # Set the globals
+    global _PROFILES
+    global _RESOLVER
+    _PROFILES = profiles
+    _RESOLVER = resolver
+
+
+def _lenex_sub_process(filename, stream=False, cache_directory=None):
+    """Process Fina result files.
+
+    Args:
+        filename: Name of LENEX file
+        stream: Read files incrementally to limit memory usage if True
+        cache_directory: Directory for cached results. None disables caching
 
     Returns:
-        alldata: List of list of data
+        meet_results: Table object
 
     """
-    # Print progress
-    print('Processing file: {}'.format(filename))
+    # Initialize key variables
+    profiles = _PROFILES
 
     # Get event data
-    data = results.FileLenex(filename, profiles)
+    raw = _raw(
+        filename, cache_directory,
+        partial(_lenex_raw, profiles=profiles, stream=stream))
 
-    # Get XML filenames
-    meet_results = data.allresults_csv(stage=None)
+    # Add height and weight
+    meet_results = table.Table.from_rows(
+        results.lenex_csv(raw, profiles, resolver=_RESOLVER))
     return meet_results
 
 
-def _olympic(olympic_directory, profiles):
-    """Process Fina result files.
+def _lenex_raw(filename, profiles, stream=False):
+    """Read results without profile data from a Fina result file.
 
     Args:
-        olympic_directory: Name of directory containing data
+        filename: Name of LENEX file
         profiles: Dict of swimmer profiles for height / weight lookup
+        stream: Read files incrementally to limit memory usage if True
 
     Returns:
-        alldata: List of list of data
+        raw: List of list of data
+
+    """
+    # Get event data
+    if stream is True:
+        data = results.StreamLenex(filename, profiles)
+    else:
+        data = results.FileLenex(filename, profiles)
+    raw = data.allresults_raw(stage=None)
+    return raw
+
+
+def _olympic_raw(filename, profiles):
+    """Read results without profile data from an Olympic result file.
+
+    Args:
+        filename: Name of XLSX file
+        profiles: Dict of swimmer profiles for height / weight lookup
+
+    Returns:
+        raw: List of list of data
+
+    """
+    # Get event data
+    data = results.FileOlympics2016(filename, profiles)
+    raw = data.results_raw()
+    return raw
+
+
+def _raw(filename, cache_directory, parser):
+    """Get results without profile data from the cache or the file.
+
+    Args:
+        filename: Name of meet file
+        cache_directory: Directory for cached results. None disables caching
+        parser: Function returning the results of a file without profile data
+
+    Returns:
+        raw: List of list of data
+
+    """
+    # Initialize key variables
+    raw = None
+    key = None
+
+    # Read the cache
+    if cache_directory is not None:
+        _cache = cache.Cache(cache_directory)
+        key = _cache.key(filename)
+        raw = _cache.read(key)
+
+    # Process the file if necessary
+    if raw is None:
+        print('Processing file: {}'.format(filename))
+        raw = parser(filename)
+        if key is not None:
+            _cache.write(key, raw)
+    else:
+        print('Using cached results for file: {}'.format(filename))
+
+    return raw
+
+
+def _olympic_filenames(olympic_directory):
+    """Get the names of Olympic result files.
+
+    Args:
+        olympic_directory: Name of directory containing data
+
+    Returns:
+        all_filenames: List of filenames
 
     """
     # Initialize key variables
-    alldata = []
+    all_filenames = []
 
     # Get a list of files in the meet directory
     files = os.listdir(olympic_directory)
@@ -199,17 +287,128 @@ def _olympic(olympic_directory, profiles):
         if filename.lower().endswith('.xlsx') is False:
             continue
 
-        # Print progress
-        print('Processing file: {}'.format(filename))
+        # Create a list of valid filenames
+        all_filenames.append(filename)
+
+    return all_filenames
+
+
+def _olympic(all_filenames, profiles, cache_directory=None, resolver=None):
+    """Process Olympic result files.
+
+    Args:
+        all_filenames: List of XLSX files
+        profiles: Dict of swimmer profiles for height / weight lookup
+        cache_directory: Directory for cached results. None disables caching
+        resolver: identity.Resolver object for inexact name matches. None
+            if only exact matches are used
+
+    Returns:
+        all_results: List of Table objects for each file
 
+    """
+    # Initialize key variables
+    all_results = []
+
+    for filename in all_filenames:
         # Get event data
-        data = results.FileOlympics2016(filename, profiles)
+        raw = _raw(
+            filename, cache_directory,
+            partial(_olympic_raw, profiles=profiles))
+
+        # Add height and weight
+        meet_results = table.Table.from_rows(
+            results.olympics_csv(raw, profiles, resolver=resolver))
+        all_results.append(meet_results)
+
+    return all_results
+
+
+def _incremental(
+        database_file, previous, lenex_filenames, olympic_filenames,
+        profiles, stream=False, cache_directory=None, resolver=None):
+    """Update the rows of an existing database.
+
+    Only new or changed source files, and files with results of athletes
+    whose profiles have changed, are processed again. The rows of all other
+    files are copied from the existing database.
+
+    Args:
+        database_file: Name of database file
+        previous: manifest.Manifest object of the existing database
+        lenex_filenames: List of LENEX files
+        olympic_filenames: List of XLSX files
+        profiles: Dict of swimmer profiles for height / weight lookup
+        stream: Read files incrementally to limit memory usage if True
+        cache_directory: Directory for cached results. None disables caching
+        resolver: identity.Resolver object for inexact name matches. None
+            if only exact matches are used
+
+    Returns:
+        all_results: Dict of Table objects keyed by filename
+
+    """
+    # Initialize key variables
+    all_results = {}
+    lenex_changed = []
+    olympic_changed = []
+    lastnames = previous.changed_lastnames(profiles)
+
+    # Read the existing rows
+    rows = table.read_csv(database_file)
+
+    # Find the files to process
+    for (filenames, changed) in [
+            (lenex_filenames, lenex_changed),
+            (olympic_filenames, olympic_changed)]:
+        for filename in filenames:
+            if previous.changed(filename) is True:
+                changed.append(filename)
+                continue
 
-        meet_results = data.allresults_csv(stage=None)
-        for item in meet_results:
-            alldata.append(item)
+            # Reuse existing rows if no athlete profiles have changed
+            (start, stop) = previous.rows(filename)
+            all_results[filename] = rows.take(slice(start, stop))
+            if bool(lastnames) is True:
+                changed.append(filename)
+
+    # Report deleted files
+    for filename in previous.sources():
+        if filename not in lenex_filenames + olympic_filenames:
+            print('Removing results of file: {}'.format(filename))
+
+    # Files with unchanged contents only need processing if they have
+    # results for athletes with changed profiles. This is cheap if the
+    # results are cached. Inexact matches may use profiles of athletes with
+    # other lastnames, so all files are processed if they are used
+    if bool(lastnames) is True and resolver is None:
+        for (changed, parser) in [
+                (lenex_changed, partial(
+                    _lenex_raw, profiles=profiles, stream=stream)),
+                (olympic_changed, partial(_olympic_raw, profiles=profiles))]:
+            for filename in list(changed):
+                if filename not in all_results:
+                    continue
+                raw = _raw(filename, cache_directory, parser)
+                if bool(set([row[10] for row in raw]) & lastnames) is False:
+                    changed.remove(filename)
+
+    # Process files
+    meet_results = _lenex(
+        lenex_changed, profiles, stream=stream,
+        cache_directory=cache_directory, resolver=resolver)
+    meet_results.extend(_olympic(
+        olympic_changed, profiles, cache_directory=cache_directory,
+        resolver=resolver))
+    for (filename, data) in zip(
+            lenex_changed + olympic_changed, meet_results):
+        all_results[filename] = data
 
-    return alldata
+    # Print status
+    print(
+        'Files updated: {}, Profile lastnames changed: {}'
+        ''.format(len(lenex_changed) + len(olympic_changed), len(lastnames)))
+    return all_results
 
 
 def main():
@@ -219,12 +418,7 @@ def main():
 
     """
     # Initialize key variables
-    alldata = [[
-        'Meet', 'City', 'Country', 'Course', 'Event ID', 'Distance', 'Stroke',
-        'Round', 'Gender', 'Firstname', 'Lastname', 'Birthyear', 'Height cm',
-        'Weight Kg', 'BMI', 'Speed / Kg', 'Speed m/s', 'Time']]
-    finadata = []
-    olympicdata = []
+    rows = 0
     ts_start = int(time.time())
 
     # Get filename
@@ -245,32 +439,102 @@ def main():
         '-d', '--database_file',
         help='Name of database file.',
         type=str, required=True)
+    parser.add_argument(
+        '-s', '--stream',
+        help='Read LENEX files incrementally to limit memory usage.',
+        action='store_true')
+    parser.add_argument(
+        '-c', '--cache_directory',
+        help='Name of directory in which to cache results read from meet '
+        'files. Only new or changed meet files are processed if used.',
+        type=str, default=None)
+    parser.add_argument(
+        '-i', '--incremental',
+        help='Only update the database with the results of new or changed '
+        'meet files and profiles. Every build stores a manifest of the '
+        'files used next to the database file. The whole database is '
+        'created again if it or the --match confidence has changed.',
+        action='store_true')
+    parser.add_argument(
+        '-b', '--binary_file',
+        help='Name of NumPy NPZ file in which to also store the database. '
+        'It loads much faster than the database file.',
+        type=str, default=None)
+    parser.add_argument(
+        '-q', '--sqlite_file',
+        help='Name of SQLite file in which to also store the database and '
+        'the athlete profiles.',
+        type=str, default=None)
+    parser.add_argument(
+        '-m', '--match',
+        help='Minimum confidence from 0 to 1 of inexact matches of athlete '
+        'names and profiles. Only exact matches are used by default.',
+        type=float, default=None)
     args = parser.parse_args()
     lenex_directory = args.lenex_directory
     profile_directory = args.profile_directory
     database_file = args.database_file
     olympic_directory = args.olympic_directory
+    stream = args.stream
+    cache_directory = args.cache_directory
+    incremental = args.incremental
+    binary_file = args.binary_file
+    sqlite_file = args.sqlite_file
+    match = args.match
+    _manifest = manifest.Manifest('{}.manifest'.format(database_file))
 
     # Get the profiles
-    profiles = _read_profiles(profile_directory)
-
-    # Process Fina data
-    finadata = _lenex(lenex_directory, profiles)
-
-    # Process Olympic data
-    olympicdata = _olympic(olympic_directory, profiles)
-
-    # Get all data
-    alldata.extend(finadata)
-    alldata.extend(olympicdata)
+    profiles = athletes.read(profile_directory)
+    if match is None:
+        resolver = None
+    else:
+        resolver = identity.Resolver(profiles, threshold=match)
+
+    # Get the files to process
+    lenex_filenames = _lenex_filenames(lenex_directory)
+    olympic_filenames = _olympic_filenames(olympic_directory)
+    filenames = lenex_filenames + olympic_filenames
+
+    if incremental is True and _manifest.reusable(
+            database_file, match) is True:
+        # Update the existing data
+        all_results = _incremental(
+            database_file, _manifest, lenex_filenames, olympic_filenames,
+            profiles, stream=stream, cache_directory=cache_directory,
+            resolver=resolver)
+        meet_results = [all_results[filename] for filename in filenames]
+    else:
+        # Process Fina data
+        finadata = _lenex(
+            lenex_filenames, profiles, stream=stream,
+            cache_directory=cache_directory, resolver=resolver)
+
+        # Process Olympic data
+        olympicdata = _olympic(
+            olympic_filenames, profiles, cache_directory=cache_directory,
+            resolver=resolver)
+        meet_results = finadata + olympicdata
+
+    # Get all data. The manifest is updated by every build so that it
+    # always describes the database file
+    for (filename, data) in zip(filenames, meet_results):
+        _manifest.update(filename, rows, rows + len(data))
+        rows += len(data)
+    alldata = table.Table.concatenate(meet_results)
+    for filename in _manifest.sources():
+        if filename not in filenames:
+            _manifest.remove(filename)
 
     # Create output file
-    with open(database_file, 'w') as f_handle:
-        writer = csv.writer(f_handle, delimiter='|')
-        writer.writerows(alldata)
+    table.write_csv(alldata, database_file)
+    if binary_file is not None:
+        table.write_npz(alldata, binary_file)
+    if sqlite_file is not None:
+        store.Store(sqlite_file).write(alldata, profiles)
+    _manifest.save(profiles, database_file, match)
 
     # Print status
-    print('Swimmer event results created: {}'.format(len(alldata) - 1))
+    print('Swimmer event results created: {}'.format(len(alldata)))
     print('Duration: {}'.format(int(time.time() - ts_start)))
 
 
@@ -6,8 +6,8 @@ import sys
 import os
 import argparse
 import csv
+import multiprocessing
 from pprint import pprint
-import pathos.multiprocessing as multiprocessing
 
 # pip3 imports
 
@@ -25,8 +25,23 @@ else:
 # Fina imports
 from fina import results
 from fina import graph
+from fina import store
+from fina import manifest
+from fina import bundle
+from fina import analysis
 from fina import log
 
+# Charts of the course of a worker process. They reuse the same figure.
+# Set once by _save_graph_initializer
+_GRAPH = None
+
+# Graph methods that draw the charts of each event and the suffixes of
+# their filenames
+_CHARTS = [
+    ('bmi_kgspeed', 'bmi-kgspeed'),
+    ('bmi_speed', 'bmi-speed'),
+    ('speed_kgspeed', 'speed-kgspeed')]
+
 
 def main():
     """Main Function.
@@ -42,19 +57,30 @@ def main():
     save = subparsers.add_parser('save')
     save.add_argument(
         '-d', '--database_file',
-        help='Name of output file.',
+        help='Name of database file. NPZ and SQLite files load faster.',
         type=str, required=True)
     save.add_argument(
         '-o', '--output_directory',
         help='Directory where all graphs will be created.',
         type=str, required=True)
+    save.add_argument(
+        '-i', '--incremental',
+        help='Only create graphs whose data has changed. A manifest of the '
+        'graphs is stored in the output directory.',
+        action='store_true')
+    save.add_argument(
+        '-t', '--threshold',
+        help='Draw the density of results instead of each result if there '
+        'are more than this number. Default: {}.'.format(
+            graph.DENSITY_THRESHOLD),
+        type=int, default=graph.DENSITY_THRESHOLD)
 
     # 'display' Parameter
     display = subparsers.add_parser(
         'display', help='Display chart on your desktop')
     display.add_argument(
         '-d', '--database_file',
-        help='Name of output file.',
+        help='Name of database file. NPZ and SQLite files load faster.',
         type=str, required=True)
     display.add_argument(
         '-l', '--distance',
@@ -78,6 +104,68 @@ def main():
         choices=['lcm', 'scm', 'scy', 'LCM', 'SCM', 'SCY'],
         help='Event stroke.',
         type=str, required=True)
+    display.add_argument(
+        '-t', '--threshold',
+        help='Draw the density of results instead of each result if there '
+        'are more than this number. Default: {}.'.format(
+            graph.DENSITY_THRESHOLD),
+        type=int, default=graph.DENSITY_THRESHOLD)
+
+    # 'export' Parameter
+    export = subparsers.add_parser(
+        'export', help='Export the best results of athletes anonymously')
+    export.add_argument(
+        '-d', '--database_file',
+        help='Name of database file. NPZ and SQLite files load faster.',
+        type=str, required=True)
+    export.add_argument(
+        '-f', '--export_file',
+        help='Name of file to create.',
+        type=str, required=True)
+    export.add_argument(
+        '-c', '--course',
+        choices=['lcm', 'scm', 'scy', 'LCM', 'SCM', 'SCY'],
+        help='Event course. All courses are exported if not set.',
+        type=str, default=None)
+
+    # 'html' Parameter
+    html = subparsers.add_parser(
+        'html', help='Create a single HTML file with the charts of all events')
+    html.add_argument(
+        '-d', '--database_file',
+        help='Name of database file. NPZ and SQLite files load faster.',
+        type=str, required=True)
+    html.add_argument(
+        '-f', '--html_file',
+        help='Name of HTML file to create.',
+        type=str, required=True)
+
+    # 'correlate' Parameter
+    correlate = subparsers.add_parser(
+        'correlate',
+        help='Correlate BMI with speed for every event and gender')
+    correlate.add_argument(
+        '-d', '--database_file',
+        help='Name of database file. NPZ and SQLite files load faster.',
+        type=str, required=True)
+    correlate.add_argument(
+        '-f', '--summary_file',
+        help='Name of file to create.',
+        type=str, required=True)
+    correlate.add_argument(
+        '-r', '--replicates',
+        help='Number of bootstrap samples and permutations used to add '
+        'confidence intervals and p-values of the Pearson coefficients. '
+        'None are added if 0. Default: 0.',
+        type=int, default=0)
+    correlate.add_argument(
+        '-s', '--seed',
+        help='Seed of the random number generators. Default: 0.',
+        type=int, default=0)
+    correlate.add_argument(
+        '-p', '--parallel',
+        help='Resample events in parallel sub processes.',
+        action='store_true')
 
     # Parse the arguments
     args = parser.parse_args()
@@ -87,6 +175,12 @@ def main():
         _save_graph(args)
     elif args.action == 'display':
         _display_graph(args)
+    elif args.action == 'export':
+        _export(args)
+    elif args.action == 'html':
+        _html(args)
+    elif args.action == 'correlate':
+        _correlate(args)
     else:
         args.print_help()
     sys.exit(0)
@@ -103,12 +197,14 @@ def _save_graph(args):
 
     """
     # Initialize key variables
-    delimiter = '|'
-    data = {}
     genders = ['M', 'F', 'B', None]
     database_file = args.database_file
     output_directory = args.output_directory
-    arguments = []
+    threshold = args.threshold
+    arguments = {}
+    digests = {}
+    _manifest = manifest.Charts(
+        os.path.join(output_directory, 'graphs.manifest'))
 
     # Make sure files and directories exist
     if os.path.isfile(database_file) is False:
@@ -121,79 +217,156 @@ def _save_graph(args):
         log.log2die(1005, log_message)
 
     # Get the parameters to be used to create graphs
-    header = True
-    with open(database_file) as csvfile:
-        f_handle = csv.reader(csvfile, delimiter=delimiter)
-        for row in f_handle:
-            # Skip the header
-            if header is True:
-                header = False
-                continue
-
-            # Create information
-            course = row[3]
-            distance = row[5]
-            stroke = row[6]
-            data['{} {} {}'.format(course, stroke, distance)] = None
+    (events, databases) = _events(database_file)
 
     # Cycle through data
     for gender in genders:
-        for value in sorted(data.keys()):
-            [course, stroke, distance] = value.split()
-            arguments.append((
-                database_file, output_directory, distance,
-                stroke, course, gender))
-
-    # Create subprocesses to do the job
-    processes = multiprocessing.cpu_count() - 1
-    with multiprocessing.Pool(processes=processes) as pool:
-        pool.starmap(_save_graph_subprocess, arguments)
+        for (course, stroke, distance) in events:
+            plot = graph.Graph(
+                database_file, course=course, database=databases[course],
+                threshold=threshold)
+            charts = []
+
+            # Only draw charts whose data has changed if incremental
+            for (chart, suffix) in _CHARTS:
+                filename = '{}-{}.png'.format(
+                    _graph_filename(
+                        output_directory, distance, stroke, course, gender),
+                    suffix)
+                digest = plot.digest(chart, stroke, distance, gender=gender)
+                digests[filename] = digest
+                if args.incremental is False or _manifest.changed(
+                        filename, digest) is True:
+                    charts.append((chart, filename))
+
+            if bool(charts) is True:
+                arguments.setdefault(course, []).append(
+                    (distance, stroke, course, gender, charts))
+
+    # Create subprocesses to do the job, one pool per course. The chart data
+    # is too large to send with every chart, so each process gets the data
+    # of its course once instead
+    processes = max(multiprocessing.cpu_count() - 1, 1)
+    for course in sorted(arguments.keys()):
+        with multiprocessing.Pool(
+                processes=processes, initializer=_save_graph_initializer,
+                initargs=(
+                    database_file, course, databases[course],
+                    threshold)) as pool:
+            pool.starmap(_save_graph_subprocess, arguments[course])
+
+    # Update the manifest
+    for filename, digest in digests.items():
+        _manifest.update(filename, digest)
+    _manifest.save()
 
     # Print status
     print('Done.')
 
 
-def _save_graph_subprocess(
-        database_file, output_directory, distance, stroke, course, gender):
-    """Display the relevant chart.
+def _events(database_file):
+    """Read the database file once and get the data of every event.
 
     Args:
         database_file: Database file Name
-        output_directory: Directory where images will be saved
+
+    Returns:
+        result: Tuple of (sorted list of tuples of (course, stroke,
+            distance), dict of graph.Data objects keyed by course)
+
+    """
+    # Initialize key variables
+    data = {}
+    databases = {}
+
+    # Read the database file once for all charts
+    alldata = store.read(database_file)
+
+    # Get the parameters to be used to create graphs
+    for (course, stroke, distance) in alldata.distinct(
+            ['course', 'stroke', 'distance']):
+        data['{} {} {}'.format(course, stroke, distance)] = None
+    events = [tuple(value.split()) for value in sorted(data.keys())]
+
+    # Create the chart data of each course from the same table
+    for (course, _, _) in events:
+        if course not in databases:
+            databases[course] = graph.Data(
+                database_file, course=course, results=alldata)
+
+    result = (events, databases)
+    return result
+
+
+def _save_graph_initializer(database_file, course, database, threshold):
+    """Create the charts of a course once in each sub process.
+
+    Args:
+        database_file: Database file Name
+        course: Course
+        database: graph.Data object of the course
+        threshold: Number of results above which densities are drawn
+
+    Returns:
+        None
+
+    """
+    # Set the global
+    global _GRAPH
+    _GRAPH = graph.Graph(
+        database_file, course=course, database=database, threshold=threshold)
+
+
+def _save_graph_subprocess(distance, stroke, course, gender, charts):
+    """Display the relevant chart.
+
+    Args:
         distance: Event distance
         stroke: Event stroke
         course: Course
         gender: Gender of participants
+        charts: List of tuples of (Graph method name, filename) of the
+            charts to create
 
     Returns:
         None
 
     """
+    # Create graph files
+    plot = _GRAPH
+    for (chart, filename) in charts:
+        # Print status
+        print(
+            'Creating chart for {}m, stroke {}, course {}, gender {} '
+            'as file: {}'
+            ''.format(distance, stroke, course, gender, filename))
+
+        getattr(plot, chart)(
+            stroke, distance, gender=gender, filename=filename)
+
+
+def _graph_filename(output_directory, distance, stroke, course, gender):
+    """Create the start of the filenames of the charts of an event.
+
+    Args:
+        output_directory: Directory where images will be saved
+        distance: Event distance
+        stroke: Event stroke
+        course: Course
+        gender: Gender of participants
+
+    Returns:
+        result: Filename without the chart suffix and extension
+
+    """
+    # Return
     graphfile = (
         '{}m-{}-{}-{}'.format(
             distance, stroke, course, gender))
-    _filename = (
+    result = (
         '{}{}{}').format(
             output_directory.rstrip(os.sep), os.sep, graphfile)
-
-    # Print status
-    print(
-        'Creating chart for {}m, stroke {}, course {}, gender {} '
-        'as file: {}'
-        ''.format(distance, stroke, course, gender, _filename))
-
-    # Create graph file
-    plot = graph.Graph(
-        database_file, course=course)
-    plot.bmi_kgspeed(
-        stroke, distance, gender=gender,
-        filename=('{}-bmi-kgspeed.png'.format(_filename)))
-    plot.bmi_speed(
-        stroke, distance, gender=gender,
-        filename=('{}-bmi-speed.png'.format(_filename)))
-    plot.speed_kgspeed(
-        stroke, distance, gender=gender,
-        filename=('{}-speed-kgspeed.png'.format(_filename)))
+    return result
 
 
 def _display_graph(args):
@@ -220,7 +393,8 @@ def _display_graph(args):
         gender = _gender
 
     # Create database in memory
-    plot = graph.Graph(database_file, course=course)
+    plot = graph.Graph(
+        database_file, course=course, threshold=args.threshold)
     plot.bmi_speed(stroke, distance, gender)
     plot.bmi_sqrt_speed(stroke, distance, gender)
     plot.bmi_sq_speed(stroke, distance, gender)
@@ -228,5 +402,110 @@ def _display_graph(args):
     plot.speed_kgspeed(stroke, distance, gender)
 
 
+def _export(args):
+    """Export the best results of athletes without their names.
+
+    Args:
+        args: CLI arguments object
+
+    Returns:
+        None
+
+    """
+    # Initialize key variables
+    database_file = args.database_file
+    header = [
+        'Athlete', 'Stroke', 'Distance', 'Gender', 'BMI', 'Speed / Kg',
+        'Speed m/s']
+
+    # Get the anonymized data
+    data = graph.Data(database_file, course=args.course)
+
+    # Create output file
+    with open(args.export_file, 'w') as f_handle:
+        writer = csv.writer(f_handle, delimiter='|')
+        writer.writerow(header)
+        writer.writerows(data.anonymized())
+
+    # Print status
+    print('Done.')
+
+
+def _html(args):
+    """Create a single HTML file with the charts of all events.
+
+    Args:
+        args: CLI arguments object
+
+    Returns:
+        None
+
+    """
+    # Initialize key variables
+    database_file = args.database_file
+
+    # Make sure files exist
+    if os.path.isfile(database_file) is False:
+        log_message = (
+            'Database file {} does not exist'.format(database_file))
+        log.log2die(1005, log_message)
+
+    # Create output file
+    (events, databases) = _events(database_file)
+    bundle.write(args.html_file, databases, events)
+
+    # Print status
+    print('Done.')
+
+
+def _correlate(args):
+    """Correlate BMI with speed for every event and gender.
+
+    Args:
+        args: CLI arguments object
+
+    Returns:
+        None
+
+    """
+    # Initialize key variables
+    database_file = args.database_file
+
+    # Make sure files exist
+    if os.path.isfile(database_file) is False:
+        log_message = (
+            'Database file {} does not exist'.format(database_file))
+        log.log2die(1005, log_message)
+
+    # Get the statistics of all events
+    (_, databases) = _events(database_file)
+    groups = analysis.Groups(databases)
+    data = analysis.correlations(groups)
+    header = analysis.HEADER
+
+    # Add confidence intervals
+    if bool(args.replicates) is True:
+        if args.parallel is True:
+            processes = max(multiprocessing.cpu_count() - 1, 1)
+            with multiprocessing.Pool(processes=processes) as pool:
+                intervals = analysis.intervals(
+                    groups, replicates=args.replicates, seed=args.seed,
+                    pool=pool)
+        else:
+            intervals = analysis.intervals(
+                groups, replicates=args.replicates, seed=args.seed)
+        data = [row + values for row, values in zip(data, intervals)]
+        header = header + analysis.INTERVAL_HEADER
+
+    # Create output file
+    with open(args.summary_file, 'w') as f_handle:
+        writer = csv.writer(f_handle, delimiter='|')
+        writer.writerow(header)
+        writer.writerows(data)
+
+    # Print status
+    print('Done.')
+
+
 if __name__ == '__main__':
     main()
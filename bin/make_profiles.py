@@ -11,12 +11,13 @@ import os
 import re
 import argparse
 import time
+import multiprocessing
 from pprint import pprint
 from collections import defaultdict
 
 # pip3 libraries
-from bs4 import BeautifulSoup
-import yaml
+import lxml.html
+from lxml import etree
 
 # Try to create a working PYTHONPATH
 _BIN_DIRECTORY = os.path.dirname(os.path.realpath(__file__))
@@ -31,6 +32,38 @@ else:
 
 # fina imports
 from fina import general
+from fina import athletes
+from fina import manifest
+
+# Version of the profiles extracted from source files. Increase it when the
+# extraction changes so that incremental runs process all files again
+_VERSION = 1
+
+# XPath queries of fina.org profiles, compiled once. Elements are matched if
+# any of their classes is the one given
+_CLASS = 'contains(concat(" ", normalize-space(@class), " "), " {} ")'
+_XPATH_VITALS = etree.XPath(
+    '//div[{}]'.format(_CLASS.format('biography-element-wrapper')))
+_XPATH_LABEL = etree.XPath(
+    'string((.//div[{}])[1])'.format(_CLASS.format('label')))
+_XPATH_VALUE = etree.XPath(
+    'string((.//div[{}])[1])'.format(_CLASS.format('value')))
+_XPATH_FIRSTNAME = etree.XPath(
+    '//div[{}]'.format(_CLASS.format('first-name')))
+_XPATH_LASTNAME = etree.XPath(
+    '//div[{}]'.format(_CLASS.format('last-name')))
+_XPATH_TEXT = etree.XPath('string()')
+
+# Patterns of rio PDF file XML lines, compiled once
+_REGEX_DATE = re.compile(r'^.*?>([0-9]+ [A-Z]+ [0-9]+)</text>$')
+_REGEX_HEIGHT = re.compile(r'^.*?>(\d{1}\.\d{2}) / \d{1}\'\d{1}.*?</text>$')
+_REGEX_WEIGHT = re.compile(r'^.*?>(\d{2,3}) / \d{2,3}</text>$')
+_REGEX_OFFSET = re.compile(
+    r'^<text .*? left="([0-9]+)" .*?<b>Name</b></text>$')
+_REGEX_COMBINED = re.compile(
+    r'^.*?>([0-9]+ [A-Z]+ [0-9]+)\s+(\d{1}\.\d{2})/\d{1}\'\d{1}.*?\s+'
+    r'(\d{2}\.\d{1})\/.*?</text>$')
+_REGEX_NUMBER = re.compile('>[0-9]')
 
 
 def _month_number(month):
@@ -62,18 +95,19 @@ def _month_number(month):
     return result
 
 
-def _final_athtlete_profiles_html(directory):
-    """Function to create list of athlete data from fina.org profiles.
+def _filenames(directory, extension=None):
+    """Function to get the names of profile source files.
 
     Args:
         directory: Name of directory containing data
+        extension: Only get files with this extension if not None
 
     Returns:
-        profiles: List of dicts of data
+        all_filenames: Sorted list of filenames
 
     """
     # Initialize key variables
-    profiles = []
+    all_filenames = []
 
     # Get a list of files in the directory
     files = os.listdir(directory)
@@ -88,155 +122,227 @@ def _final_athtlete_profiles_html(directory):
         # Skip obvious
         if os.path.isfile(filename) is False:
             continue
+        if extension is not None and filename.lower().endswith(
+                extension) is False:
+            continue
+        all_filenames.append(filename)
 
-        # Print status
-        print('Processing file: {}'.format(filename))
+    return all_filenames
 
-        # Initialize profile
-        profile = {}
 
-        # Read file
-        with open(filename, 'r') as reader:
-            html = reader.read()
-
-        # Get div 'biography-element-wrapper'
-        soup = BeautifulSoup(html, 'html.parser')
-
-        # Get vitals
-        elements = soup.find_all('div', {'class': 'biography-element-wrapper'})
-        for element in elements:
-            label = element.find(
-                'div', {'class': 'label'}).get_text().lower().strip()
-            value = element.find('div', {'class': 'value'}).get_text().strip()
-            if label == 'weight':
-                profile[label] = float(re.sub('[^0-9]', '', value))
-            elif label == 'height':
-                profile[label] = float(re.sub('[^0-9]', '', value))
-            elif label == 'date of birth':
-                components = value.split()
-                day = components[0].zfill(2)
-                month = _month_number(components[1])
-                year = components[2]
-                value = '-'.join([year, month, day])
-                profile['birthdate'] = value
-
-        # Get name
-        for div in ['first-name', 'last-name']:
-            elements = soup.find_all('div', {'class': div})
-            for element in elements:
-                profile[div.replace('-', '')] = general.fix_name(
-                    element.get_text())
+def _extract(filenames, extractor, pool, manifest=None):
+    """Function to extract athlete data from profile source files.
 
-        # We have all the data we have the right
-        # most relevant value
-        if len(profile.keys()) == 5:
-            profile['lastname'] = profile['lastname'].upper()
-            profiles.append(profile)
+    Args:
+        filenames: List of source files
+        extractor: Function returning the list of profile dicts of a file
+        pool: multiprocessing Pool object
+        manifest: manifest.Profiles object. Profiles of unchanged files are
+            read from it instead of the file if not None. It is updated
+            with the profiles of the other files
+
+    Returns:
+        profiles: List of dicts of data in filename order
+
+    """
+    # Initialize key variables
+    profiles = []
+    changed = [
+        filename for filename in filenames
+        if manifest is None or manifest.changed(filename) is True]
+
+    # Create subprocesses to do the job. Files are sent in batches as most
+    # are quick to parse
+    processes = max(multiprocessing.cpu_count() - 1, 1)
+    chunksize = max(len(changed) // (processes * 4), 1)
+    found = dict(zip(
+        changed, pool.map(extractor, changed, chunksize=chunksize)))
+
+    # Keep the order of the files
+    for filename in filenames:
+        if filename in found:
+            if manifest is not None:
+                manifest.update(filename, found[filename])
+            profiles.extend(found[filename])
+        else:
+            print('Using recorded profiles of file: {}'.format(filename))
+            profiles.extend(manifest.profiles(filename))
 
     return profiles
 
 
-def _listing_xml(directory):
-    """Function to create list of athlete data from rio PDF file XML.
+def _html_profiles(filename):
+    """Function to get athlete data from a fina.org profile.
 
     Args:
-        directory: Name of directory containing data
+        filename: Name of HTML file
 
     Returns:
-        data: List of dicts of data
+        profiles: List of dicts of data. Empty if some values are missing
+
+    """
+    # Return
+    profile = _html_profile(filename)
+    if profile is None:
+        profiles = []
+    else:
+        profiles = [profile]
+    return profiles
+
+
+def _html_profile(filename):
+    """Function to get athlete data from a fina.org profile.
+
+    Args:
+        filename: Name of HTML file
+
+    Returns:
+        profile: Dict of data. None if some values are missing
+
+    """
+    # Print status
+    print('Processing file: {}'.format(filename))
+
+    # Initialize profile
+    profile = {}
+
+    # Read file
+    with open(filename, 'r') as reader:
+        html = reader.read()
+    document = lxml.html.document_fromstring(html)
+
+    # Get vitals from div 'biography-element-wrapper'
+    for element in _XPATH_VITALS(document):
+        label = _XPATH_LABEL(element).lower().strip()
+        value = _XPATH_VALUE(element).strip()
+        if label == 'weight':
+            profile[label] = float(re.sub('[^0-9]', '', value))
+        elif label == 'height':
+            profile[label] = float(re.sub('[^0-9]', '', value))
+        elif label == 'date of birth':
+            components = value.split()
+            day = components[0].zfill(2)
+            month = _month_number(components[1])
+            year = components[2]
+            value = '-'.join([year, month, day])
+            profile['birthdate'] = value
+
+    # Get name
+    for (key, xpath) in [
+            ('firstname', _XPATH_FIRSTNAME), ('lastname', _XPATH_LASTNAME)]:
+        for element in xpath(document):
+            profile[key] = general.fix_name(_XPATH_TEXT(element))
+
+    # We have all the data we have the right
+    # most relevant value
+    if len(profile.keys()) == 5:
+        profile['lastname'] = profile['lastname'].upper()
+    else:
+        profile = None
+    return profile
+
+
+def _listing_profiles(filename):
+    """Function to get athlete data from a rio PDF file XML.
+
+    Args:
+        filename: Name of XML file
+
+    Returns:
+        profiles: List of dicts of data
 
     """
     # Initialize key variables
     profiles = []
-    regex_date = re.compile(r'^.*?>([0-9]+ [A-Z]+ [0-9]+)</text>$')
-    regex_height = re.compile(r'^.*?>(\d{1}\.\d{2}) / \d{1}\'\d{1}.*?</text>$')
-    regex_weight = re.compile(r'^.*?>(\d{2,3}) / \d{2,3}</text>$')
-    regex_offset = re.compile(
-        r'^<text .*? left="([0-9]+)" .*?<b>Name</b></text>$')
-    regex_combined = re.compile(
-        r'^.*?>([0-9]+ [A-Z]+ [0-9]+)\s+(\d{1}\.\d{2})/\d{1}\'\d{1}.*?\s+'
-        '(\d{2}\.\d{1})\/.*?</text>$')
+    profile = {}
+    pending = []
+    marker = None
+
+    # Print status
+    print('Processing file: {}'.format(filename))
+
+    # Read file once. The offset where the names will be found is given by
+    # the table headings. Lines before the first heading are kept until the
+    # offset is known
+    with open(filename, 'r') as reader:
+        for line in reader:
+            if marker is None:
+                found = _REGEX_OFFSET.match(line)
+                if bool(found) is False:
+                    pending.append(line)
+                    continue
+                marker = ' left="{}" '.format(found.group(1))
+                for _line in pending:
+                    profile = _listing_line(_line, marker, profile, profiles)
+            profile = _listing_line(line, marker, profile, profiles)
 
-    # Get a list of files in the directory
-    files = os.listdir(directory)
-    filenames = ['{}{}{}'.format(
-        directory.rstrip(os.sep), os.sep, nextfile) for nextfile in files]
+    return profiles
 
-    for _filename in sorted(filenames):
-        # Get rid of excess os.sep separators
-        pathitems = _filename.split(os.sep)
-        filename = os.sep.join(pathitems)
 
-        # Skip obvious
-        if os.path.isfile(filename) is False:
-            continue
-        if filename.lower().endswith('.xml') is False:
-            continue
+def _listing_line(line, marker, profile, profiles):
+    """Function to get athlete data from a line of rio PDF file XML.
 
-        # Print status
-        print('Processing file: {}'.format(filename))
-
-        # Read file to get the offset where the names will be found. We use
-        # the table headings to get this value
-        with open(filename, 'r') as reader:
-            profile = {}
-            for line in reader:
-                found = regex_offset.match(line)
-                if bool(found) is True:
-                    offset = found.group(1)
-                    break
-
-        # Read file
-        with open(filename, 'r') as reader:
-            profile = {}
-            for line in reader:
-                # Skip headers
-                if '<b>' in line:
-                    continue
+    Args:
+        line: Line of XML
+        marker: Text found in lines with athlete names
+        profile: Dict of data of the current athlete
+        profiles: List of dicts of data of complete athletes. Updated
+            in place
 
-                # Get name
-                if ' left="{}" '.format(offset) in line:
-                    profile = {}
-                    text = _get_text(line)
-                    found = general.olympic_name(text)
-                    if bool(found) is True:
-                        (profile['firstname'], profile['lastname']) = found
-
-                # Check date. The position of this column varies so
-                # we have to use a different methodology
-                found = regex_date.match(line)
-                if bool(found) is True:
-                    profile['birthdate'] = _xml_birthdate(found.group(1))
-
-                # height:
-                found = regex_height.match(line)
-                if bool(found) is True:
-                    profile['height'] = float(found.group(1)) * 100
-
-                # weight
-                found = regex_weight.match(line)
-                if bool(found) is True:
-                    profile['weight'] = float(found.group(1))
-
-                    # We have all the data we have the right
-                    # most relevant value
-                    if len(profile.keys()) == 5:
-                        profiles.append(profile)
-
-                # Some files have weight, height and birthdate on the same line
-                found = regex_combined.match(line)
-                if bool(found) is True:
-                    profile['birthdate'] = _xml_birthdate(found.group(1))
-                    profile['height'] = float(found.group(2)) * 100
-                    profile['weight'] = float(found.group(3))
-
-                    # We have all the data we have the right
-                    # most relevant value
-                    if len(profile.keys()) == 5:
-                        profiles.append(profile)
-
-    data = _dedup(profiles)
-    return data
+    Returns:
+        profile: Dict of data of the current athlete
+
+    """
+    # Skip headers
+    if '<b>' in line:
+        return profile
+
+    # Get name
+    if marker in line:
+        profile = {}
+        text = _get_text(line)
+        found = general.olympic_name(text)
+        if bool(found) is True:
+            (profile['firstname'], profile['lastname']) = found
+
+    # All other values start with a number
+    if _REGEX_NUMBER.search(line) is None:
+        return profile
+
+    # Check date. The position of this column varies so
+    # we have to use a different methodology
+    found = _REGEX_DATE.match(line)
+    if bool(found) is True:
+        profile['birthdate'] = _xml_birthdate(found.group(1))
+
+    # height:
+    found = _REGEX_HEIGHT.match(line)
+    if bool(found) is True:
+        profile['height'] = float(found.group(1)) * 100
+
+    # weight
+    found = _REGEX_WEIGHT.match(line)
+    if bool(found) is True:
+        profile['weight'] = float(found.group(1))
+
+        # We have all the data we have the right
+        # most relevant value
+        if len(profile.keys()) == 5:
+            profiles.append(profile)
+
+    # Some files have weight, height and birthdate on the same line
+    found = _REGEX_COMBINED.match(line)
+    if bool(found) is True:
+        profile['birthdate'] = _xml_birthdate(found.group(1))
+        profile['height'] = float(found.group(2)) * 100
+        profile['weight'] = float(found.group(3))
+
+        # We have all the data we have the right
+        # most relevant value
+        if len(profile.keys()) == 5:
+            profiles.append(profile)
+
+    return profile
 
 
 def _xml_birthdate(text):
@@ -336,21 +442,57 @@ def main():
         '-p', '--profile_directory',
         help='Name of directory in which combined profiles will be stored.',
         type=str, required=True)
+    parser.add_argument(
+        '-i', '--incremental',
+        help='Only process new or changed source files. The profiles '
+        'extracted from each file are stored in a manifest in the profile '
+        'directory.',
+        action='store_true')
     args = parser.parse_args()
     fina_directory = args.fina_directory
     listing_directory = args.listing_directory
     profile_directory = args.profile_directory
-
-    # Get profiles
-    profiles.extend(_listing_xml(listing_directory))
-
-    # Get more profiles
-    profiles.extend(_final_athtlete_profiles_html(fina_directory))
+    incremental = args.incremental
+    _manifest = None
+
+    # Get the files to process
+    listing_filenames = _filenames(listing_directory, extension='.xml')
+    fina_filenames = _filenames(fina_directory)
+    filenames = listing_filenames + fina_filenames
+    if incremental is True:
+        _manifest = manifest.Profiles(
+            os.path.join(profile_directory, '{}.manifest'.format(
+                athletes.FILENAME)), _VERSION)
+        updated = [
+            filename for filename in filenames
+            if _manifest.changed(filename) is True] + [
+                filename for filename in _manifest.sources()
+                if filename not in filenames]
+        print('Files updated: {}'.format(len(updated)))
+
+        # Nothing to do
+        yaml_file = os.path.join(
+            profile_directory, '{}.yaml'.format(athletes.FILENAME))
+        if bool(updated) is False and _manifest.exists() is True and (
+                os.path.isfile(yaml_file) is True):
+            print('Athlete profiles are up to date')
+            return
+
+    # Get profiles, then more profiles, in the same pool
+    processes = max(multiprocessing.cpu_count() - 1, 1)
+    with multiprocessing.Pool(processes=processes) as pool:
+        profiles.extend(_extract(
+            listing_filenames, _listing_profiles, pool, manifest=_manifest))
+        profiles.extend(_extract(
+            fina_filenames, _html_profiles, pool, manifest=_manifest))
     uniques = _dedup(profiles)
 
-    data = yaml.dump({'data': uniques}, default_flow_style=False)
-    with open('{}/athletes.yaml'.format(profile_directory), 'w') as writer:
-        writer.write(data)
+    athletes.write(profile_directory, uniques)
+    if incremental is True:
+        for filename in _manifest.sources():
+            if filename not in filenames:
+                _manifest.remove(filename)
+        _manifest.save()
 
     # Describe success
     print('Athlete profiles processed: {}'.format(len(uniques)))
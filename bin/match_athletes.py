@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Script to report how athletes in meet results match athlete profiles.
+
+Every athlete in the results is matched to the profile with the most
+similar name and the same birth date. Athletes with only a birth year are
+matched to profiles born that year, and athletes without either by name
+alone. The report lists the confidence of each match so
+that a threshold can be chosen for make_database.py.
+
+"""
+
+# Standard imports
+import sys
+import os
+import argparse
+import csv
+import time
+from functools import partial
+
+# Try to create a working PYTHONPATH
+_BIN_DIRECTORY = os.path.dirname(os.path.realpath(__file__))
+_ROOT_DIRECTORY = os.path.abspath(os.path.join(_BIN_DIRECTORY, os.pardir))
+if _BIN_DIRECTORY.endswith('/fina/bin') is True:
+    sys.path.append(_ROOT_DIRECTORY)
+else:
+    print(
+        'This script is not installed in the "fina/bin" directory. '
+        'Please fix.')
+    sys.exit(2)
+
+# Fina imports
+from fina import athletes
+from fina import identity
+import make_database
+
+# Column names of the report file
+_HEADER = [
+    'Firstname', 'Lastname', 'Birthdate', 'Profile Firstname',
+    'Profile Lastname', 'Profile Birthdate', 'Confidence']
+
+
+def _identities(lenex_directory, olympic_directory, profiles,
+                cache_directory=None):
+    """Get the athletes in all meet results.
+
+    Args:
+        lenex_directory: Name of directory with LENEX XML files
+        olympic_directory: Name of directory with Olympic XLSX files
+        profiles: Dict of swimmer profiles
+        cache_directory: Directory for cached results. None disables caching
+
+    Returns:
+        data: Sorted list of (firstname, lastname, birthdate) tuples.
+            Olympic results have birth years instead. None if unknown
+
+    """
+    # Initialize key variables
+    found = set()
+
+    # LENEX results have birthdates
+    for filename in make_database._lenex_filenames(lenex_directory):
+        raw = make_database._raw(
+            filename, cache_directory,
+            partial(make_database._lenex_raw, profiles=profiles))
+        found.update([(row[9], row[10], row[11]) for row in raw])
+
+    # Olympic results only have birth years, as make_database.py uses them
+    for filename in make_database._olympic_filenames(olympic_directory):
+        raw = make_database._raw(
+            filename, cache_directory,
+            partial(make_database._olympic_raw, profiles=profiles))
+        found.update([
+            (row[9], row[10], identity.year(row[11])) for row in raw])
+
+    data = sorted(found, key=lambda key: (key[1], key[0], str(key[2])))
+    return data
+
+
+def main():
+    """Main Function.
+
+    Match athletes to profiles
+
+    """
+    # Initialize key variables
+    rows = []
+    counts = {'exact': 0, 'matched': 0, 'unmatched': 0}
+
+    # Get CLI arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '-l', '--lenex_directory',
+        help='Name of directory with LENEX XML files.',
+        type=str, required=True)
+    parser.add_argument(
+        '-o', '--olympic_directory',
+        help='Name of directory with Olympic XLSX files.',
+        type=str, required=True)
+    parser.add_argument(
+        '-p', '--profile_directory',
+        help='Name of directory with athlete profiles.',
+        type=str, required=True)
+    parser.add_argument(
+        '-f', '--report_file',
+        help='Name of file in which to store the match of each athlete.',
+        type=str, required=True)
+    parser.add_argument(
+        '-c', '--cache_directory',
+        help='Name of directory with results cached by make_database.py.',
+        type=str, default=None)
+    parser.add_argument(
+        '-m', '--match',
+        help='Minimum confidence of matches counted in the summary.',
+        type=float, default=0.9)
+    args = parser.parse_args()
+
+    # Get the athletes
+    profiles = athletes.read(args.profile_directory)
+    keys = _identities(
+        args.lenex_directory, args.olympic_directory, profiles,
+        cache_directory=args.cache_directory)
+
+    # Match them
+    ts_start = time.time()
+    resolver = identity.Resolver(profiles, threshold=args.match)
+    for (firstname, lastname, birthdate) in keys:
+        found = resolver.match(firstname, lastname, birthdate=birthdate)
+        if found is None:
+            profile = ['N/A'] * 3
+            confidence = 'N/A'
+            counts['unmatched'] += 1
+        else:
+            (profile, confidence) = found
+            profile = [profile[1], profile[0], profile[2]]
+            confidence = round(confidence, 3)
+            if confidence == 1:
+                counts['exact'] += 1
+            elif confidence >= args.match:
+                counts['matched'] += 1
+            else:
+                counts['unmatched'] += 1
+        rows.append(
+            [firstname, lastname, 'N/A' if birthdate is None else birthdate] +
+            profile + [confidence])
+    duration = time.time() - ts_start
+
+    # Create output file
+    with open(args.report_file, 'w') as f_handle:
+        writer = csv.writer(f_handle, delimiter='|')
+        writer.writerow(_HEADER)
+        writer.writerows(rows)
+
+    # Print status
+    print(
+        'Athletes: {}, Exact matches: {}, Inexact matches: {}, '
+        'Unmatched: {}'.format(
+            len(keys), counts['exact'], counts['matched'],
+            counts['unmatched']))
+    print('Matching duration: {:.3f}s'.format(duration))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,369 @@
+"""Module to measure how BMI correlates with performance.
+
+The results of every course, event and gender are stacked into single
+arrays with a group number for each result, so that the statistics of all
+groups are calculated at once.
+
+"""
+
+# Standard imports
+import itertools
+
+# pip3 imports
+import numpy as np
+
+# Measurements of performance correlated with BMI and the Data methods that
+# get them
+MEASUREMENTS = [
+    ('speed', 'speed'),
+    ('speed_per_kg', 'kgspeed'),
+    ('sqrt_speed', 'sqrt_speed'),
+    ('sq_speed', 'sq_speed')]
+
+# Column names of the summary table
+HEADER = [
+    'Course', 'Stroke', 'Distance', 'Gender', 'Measurement', 'Results',
+    'Pearson', 'Spearman', 'Slope', 'Intercept']
+
+# Column names added to the summary table by intervals
+INTERVAL_HEADER = ['Pearson Low', 'Pearson High', 'P-Value']
+
+# Maximum number of values resampled at once
+_MAX_VALUES = 1000000
+
+
+class Groups(object):
+    """Results of every course, event and gender stacked together."""
+
+    def __init__(self, databases):
+        """Method to instantiate the class.
+
+        Args:
+            databases: Dict of graph.Data objects keyed by course
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self.keys = []
+        groups = []
+        values = {'bmi': []}
+        for (measurement, _) in MEASUREMENTS:
+            values[measurement] = []
+
+        # Get the arrays of each group
+        for course in sorted(databases.keys()):
+            database = databases[course]
+            for (stroke, distance, gender) in database.groups():
+                bmis = database.bmi(stroke, distance, gender)
+                groups.append(np.full(len(bmis), len(self.keys)))
+                values['bmi'].append(bmis)
+                for (measurement, method) in MEASUREMENTS:
+                    values[measurement].append(
+                        getattr(database, method)(stroke, distance, gender))
+                self.keys.append((course, stroke, distance, gender))
+
+        # Stack them
+        self.groups = np.concatenate(
+            groups + [np.array([], dtype=np.int64)]).astype(np.int64)
+        self.values = {
+            name: np.concatenate(arrays + [np.array([])])
+            for name, arrays in values.items()}
+
+    def __len__(self):
+        """Get the number of groups.
+
+        Args:
+            None
+
+        Returns:
+            result: Number of groups
+
+        """
+        # Return
+        result = len(self.keys)
+        return result
+
+
+def correlations(groups):
+    """Correlate BMI with each measurement of performance in every group.
+
+    Args:
+        groups: Groups object
+
+    Returns:
+        data: List of rows of the summary table. Correlations of groups
+            with less than two results are NaN
+
+    """
+    # Initialize key variables
+    data = []
+    results = {}
+    count = len(groups)
+
+    # Calculate the statistics of all groups at once for each measurement
+    for (measurement, _) in MEASUREMENTS:
+        x_values = groups.values[measurement]
+        y_values = groups.values['bmi']
+
+        # Ignore results without values
+        finite = np.isfinite(x_values) & np.isfinite(y_values)
+        x_values = x_values[finite]
+        y_values = y_values[finite]
+        _groups = groups.groups[finite]
+
+        (sizes, pearson, slope, intercept) = pearson_fit(
+            x_values, y_values, _groups, count)
+        (_, spearman, _, _) = pearson_fit(
+            ranks(x_values, _groups), ranks(y_values, _groups),
+            _groups, count)
+        results[measurement] = (sizes, pearson, spearman, slope, intercept)
+
+    # Create rows
+    for index, (course, stroke, distance, gender) in enumerate(groups.keys):
+        for (measurement, _) in MEASUREMENTS:
+            (sizes, pearson, spearman, slope, intercept) = results[
+                measurement]
+            data.append([
+                course, stroke, distance, str(gender), measurement,
+                int(sizes[index]), _rounded(pearson[index]),
+                _rounded(spearman[index]), _rounded(slope[index]),
+                _rounded(intercept[index])])
+    return data
+
+
+def intervals(groups, replicates=1000, seed=0, level=0.95, pool=None):
+    """Resample the Pearson coefficients of every group.
+
+    Args:
+        groups: Groups object
+        replicates: Number of bootstrap samples and permutations of each
+            group
+        seed: Seed of the random number generators. The results are the
+            same every time for the same seed, with or without a pool
+        level: Confidence level of the intervals
+        pool: Object with a starmap method, such as a multiprocessing
+            Pool, used to resample groups in parallel. Groups are
+            resampled in this process if None
+
+    Returns:
+        data: List of rows of (low, high, p-value) of each group and
+            measurement in the order of the rows of correlations
+
+    """
+    # Initialize key variables
+    arguments = []
+    values = {}
+    seeds = iter(np.random.SeedSequence(seed).spawn(
+        len(groups) * len(MEASUREMENTS)))
+
+    # Ignore results without values. Values are already sorted by group
+    for (measurement, _) in MEASUREMENTS:
+        x_values = groups.values[measurement]
+        y_values = groups.values['bmi']
+        finite = np.isfinite(x_values) & np.isfinite(y_values)
+        boundaries = np.searchsorted(
+            groups.groups[finite], np.arange(len(groups) + 1))
+        values[measurement] = (
+            x_values[finite], y_values[finite], boundaries)
+
+    # Each group and measurement has its own random number generator
+    for index in range(len(groups)):
+        for (measurement, _) in MEASUREMENTS:
+            (x_values, y_values, boundaries) = values[measurement]
+            start = boundaries[index]
+            stop = boundaries[index + 1]
+            arguments.append((
+                x_values[start:stop], y_values[start:stop], replicates,
+                next(seeds), level))
+
+    # Resample
+    if pool is None:
+        results = list(itertools.starmap(resample, arguments))
+    else:
+        results = pool.starmap(resample, arguments)
+
+    data = [
+        [_rounded(value) for value in result] for result in results]
+    return data
+
+
+def resample(x_values, y_values, replicates, seed, level=0.95):
+    """Resample the Pearson coefficient of a group.
+
+    All the bootstrap samples and permutations are created as matrices
+    with one replicate per row and correlated together.
+
+    Args:
+        x_values: Array of x values
+        y_values: Array of y values
+        replicates: Number of bootstrap samples and permutations
+        seed: Seed of the random number generator
+        level: Confidence level of the interval
+
+    Returns:
+        result: List of (low, high, p-value). The interval is the
+            percentile bootstrap interval. The p-value is the two sided
+            probability of a coefficient at least as large when y values
+            are permuted. NaN if there are less than three values or the
+            x or y values are constant
+
+    """
+    # Initialize key variables
+    size = len(x_values)
+    generator = np.random.default_rng(seed)
+    bootstrap = []
+    permuted = []
+    if size < 3 or bool(replicates) is False:
+        result = [np.nan] * 3
+        return result
+
+    # Constant values have no coefficient to resample
+    observed = batch_pearson(
+        x_values[np.newaxis], y_values[np.newaxis])[0]
+    if bool(np.isfinite(observed)) is False:
+        result = [np.nan] * 3
+        return result
+
+    # Limit the memory used by each batch of replicates
+    rows = max(_MAX_VALUES // size, 1)
+    for start in range(0, replicates, rows):
+        count = min(rows, replicates - start)
+
+        # Bootstrap samples
+        indices = generator.integers(0, size, size=(count, size))
+        bootstrap.append(batch_pearson(
+            x_values[indices], y_values[indices]))
+
+        # Permutations
+        shuffled = generator.permuted(
+            np.tile(y_values, (count, 1)), axis=1)
+        permuted.append(batch_pearson(
+            np.broadcast_to(x_values, shuffled.shape), shuffled))
+
+    bootstrap = np.concatenate(bootstrap)
+    permuted = np.concatenate(permuted)
+
+    # Samples with constant values have no coefficient
+    tail = 50 * (1 - level)
+    if bool(np.isfinite(bootstrap).any()) is False:
+        (low, high) = (np.nan, np.nan)
+    else:
+        (low, high) = np.nanpercentile(bootstrap, [tail, 100 - tail])
+    p_value = (1 + np.sum(np.abs(permuted) >= abs(observed))) / (
+        replicates + 1)
+
+    result = [low, high, p_value]
+    return result
+
+
+def batch_pearson(x_values, y_values):
+    """Calculate the Pearson coefficient of each row of two matrices.
+
+    Args:
+        x_values: Matrix of x values
+        y_values: Matrix of y values
+
+    Returns:
+        result: Array of coefficients. NaN for rows of constant values
+
+    """
+    # Center each row
+    x_values = x_values - x_values.mean(axis=1, keepdims=True)
+    y_values = y_values - y_values.mean(axis=1, keepdims=True)
+
+    # Correlate
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.einsum('ij,ij->i', x_values, y_values) / np.sqrt(
+            np.einsum('ij,ij->i', x_values, x_values) *
+            np.einsum('ij,ij->i', y_values, y_values))
+    return result
+
+
+def pearson_fit(x_values, y_values, groups, count):
+    """Calculate Pearson coefficients and least squares lines of groups.
+
+    Args:
+        x_values: Array of x values
+        y_values: Array of y values
+        groups: Array of the group number of each value
+        count: Number of groups
+
+    Returns:
+        result: Tuple of arrays of (number of values, Pearson coefficient,
+            slope, intercept) of each group. Lines fit y to x
+
+    """
+    # Initialize key variables
+    sizes = np.bincount(groups, minlength=count)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Center the values of each group
+        x_means = np.bincount(groups, x_values, minlength=count) / sizes
+        y_means = np.bincount(groups, y_values, minlength=count) / sizes
+        x_values = x_values - x_means[groups]
+        y_values = y_values - y_means[groups]
+
+        # Sums of squares and products of each group
+        xx_sums = np.bincount(groups, x_values * x_values, minlength=count)
+        yy_sums = np.bincount(groups, y_values * y_values, minlength=count)
+        xy_sums = np.bincount(groups, x_values * y_values, minlength=count)
+
+        pearson = xy_sums / np.sqrt(xx_sums * yy_sums)
+        slope = xy_sums / xx_sums
+        intercept = y_means - slope * x_means
+
+    result = (sizes, pearson, slope, intercept)
+    return result
+
+
+def ranks(values, groups):
+    """Rank values within their groups.
+
+    Args:
+        values: Array of values
+        groups: Array of the group number of each value
+
+    Returns:
+        result: Array of ranks starting at 1. Equal values get the average
+            of their ranks
+
+    """
+    # Sort by group then value
+    order = np.lexsort((values, groups))
+    _values = values[order]
+    _groups = groups[order]
+    positions = np.arange(len(values))
+
+    # Ranks count from the start of each group
+    starts = np.searchsorted(_groups, _groups, side='left')
+
+    # Runs of equal values share the same rank
+    new = np.ones(len(values), dtype=bool)
+    new[1:] = (_values[1:] != _values[:-1]) | (_groups[1:] != _groups[:-1])
+    runs = np.cumsum(new) - 1
+    firsts = positions[new]
+    lasts = np.append(firsts[1:], len(values)) - 1
+
+    result = np.empty(len(values))
+    result[order] = (firsts[runs] + lasts[runs]) / 2 - starts + 1
+    return result
+
+
+def _rounded(value):
+    """Round a statistic for the summary table.
+
+    Args:
+        value: Float
+
+    Returns:
+        result: Float rounded to 6 decimal places. N/A for NaN values
+
+    """
+    # Round
+    if value != value:
+        result = 'N/A'
+    else:
+        result = round(float(value), 6)
+    return result
@@ -0,0 +1,178 @@
+"""Module to store athlete profiles.
+
+Profiles are stored in a YAML file and in a NumPy NPZ file that loads
+without being parsed. The NPZ file records the YAML files it was created
+from. It is used unless the profile directory has other YAML files or a
+YAML file is newer.
+
+"""
+
+# Standard imports
+import os
+
+# pip3 imports
+import numpy as np
+import yaml
+
+# Fina imports
+from fina import log
+
+# Name of profile files without their extension
+FILENAME = 'athletes'
+
+# Use the C YAML parser if it is installed
+_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def read(profile_directory):
+    """Read athlete profiles.
+
+    Args:
+        profile_directory: Name of directory with profile files
+
+    Returns:
+        profiles: Dict of profiles keyed by lastname, firstname, birthdate
+
+    """
+    # Initialize key variables
+    data = None
+    npz_file = _filename(profile_directory, 'npz')
+    sources = [
+        filename for filename in sorted(os.listdir(profile_directory))
+        if filename.lower().endswith('.yaml') is True]
+    yaml_files = [
+        os.path.join(profile_directory, filename) for filename in sources]
+
+    # Only parse YAML files if they have changed since the NPZ file was
+    # created from them
+    if os.path.isfile(npz_file) is True and all(
+            os.path.getmtime(filename) <= os.path.getmtime(npz_file)
+            for filename in yaml_files) is True:
+        data = _read_npz(npz_file, sources)
+    if data is None:
+        data = []
+        for filename in yaml_files:
+            data.extend(_read_yaml(filename))
+
+    profiles = index(data)
+    return profiles
+
+
+def write(profile_directory, data):
+    """Write athlete profiles.
+
+    Args:
+        profile_directory: Name of directory with profile files
+        data: List of profile dicts with firstname, lastname, birthdate,
+            height and weight keys
+
+    Returns:
+        None
+
+    """
+    # Create the YAML file
+    with open(_filename(profile_directory, 'yaml'), 'w') as writer:
+        writer.write(yaml.dump({'data': data}, default_flow_style=False))
+
+    # Create the NPZ file last so that it is newer
+    arrays = {}
+    for key in ['firstname', 'lastname', 'birthdate']:
+        arrays[key] = np.array(
+            [item[key] for item in data], dtype=str)
+    for key in ['height', 'weight']:
+        arrays[key] = np.array(
+            [item[key] for item in data], dtype=np.float64)
+    arrays['sources'] = np.array(
+        [os.path.basename(_filename(profile_directory, 'yaml'))], dtype=str)
+    with open(_filename(profile_directory, 'npz'), 'wb') as f_handle:
+        np.savez_compressed(f_handle, **arrays)
+
+
+def index(data):
+    """Index athlete profiles by name and birthdate.
+
+    Args:
+        data: List of profile dicts with firstname, lastname, birthdate,
+            height and weight keys
+
+    Returns:
+        profiles: Dict of profiles keyed by lastname, firstname, birthdate.
+            Only plain dicts are used so that profiles can be pickled by
+            the standard library
+
+    """
+    # Initialize key variables
+    profiles = {}
+
+    # Create dictionary
+    for item in data:
+        profiles.setdefault(item['lastname'], {}).setdefault(
+            item['firstname'], {})[item['birthdate']] = {
+                'height': item['height'], 'weight': item['weight']}
+    return profiles
+
+
+def _read_yaml(filename):
+    """Read a YAML profile file.
+
+    Args:
+        filename: Name of file
+
+    Returns:
+        data: List of profile dicts
+
+    """
+    # Read
+    with open(filename, 'r') as stream:
+        try:
+            data = yaml.load(stream, Loader=_LOADER)['data']
+        except yaml.YAMLError as exc:
+            log_message = (
+                'Profile file {} is not valid YAML: {}'.format(filename, exc))
+            log.log2die(1010, log_message)
+    return data
+
+
+def _read_npz(filename, sources):
+    """Read an NPZ profile file.
+
+    Args:
+        filename: Name of file
+        sources: Sorted list of the names of the YAML files in the profile
+            directory
+
+    Returns:
+        data: List of profile dicts. None if the file wasn't created from
+            the YAML files
+
+    """
+    # Initialize key variables
+    keys = ['firstname', 'lastname', 'birthdate', 'height', 'weight']
+
+    # Read the arrays. Nothing needs to be parsed. Missing values are NaN
+    with np.load(filename) as arrays:
+        if 'sources' not in arrays.files or sorted(
+                arrays['sources'].tolist()) != sources:
+            return None
+        columns = [arrays[key].tolist() for key in keys]
+    for column in columns[3:]:
+        column[:] = [None if value != value else value for value in column]
+    data = [dict(zip(keys, values)) for values in zip(*columns)]
+    return data
+
+
+def _filename(profile_directory, extension):
+    """Get the name of a profile file.
+
+    Args:
+        profile_directory: Name of directory with profile files
+        extension: File extension
+
+    Returns:
+        result: Filename
+
+    """
+    # Return
+    result = os.path.join(
+        profile_directory, '{}.{}'.format(FILENAME, extension))
+    return result
@@ -0,0 +1,380 @@
+"""Module to create a single HTML file with the charts of every event.
+
+The values of each event are stored once in the file as JSON. The charts
+are drawn by the web browser, so no images need to be created.
+
+"""
+
+# Standard imports
+import json
+
+# pip3 imports
+import numpy as np
+
+# Number of significant digits of stored values
+DIGITS = 6
+
+# HTML file. The chart data replaces __DATA__
+_TEMPLATE = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Swimmer BMI and Speed</title>
+<style>
+body { font-family: sans-serif; margin: 1em; }
+select { margin-right: 1em; }
+canvas { display: block; margin-top: 1em; }
+</style>
+</head>
+<body>
+<label>Event <select id="event"></select></label>
+<label>Gender <select id="gender">
+<option value="M">Men</option>
+<option value="F">Women</option>
+<option value="B">Men and Women</option>
+<option value="None">Combined</option>
+</select></label>
+<div id="charts"></div>
+<script type="application/json" id="data">__DATA__</script>
+<script>
+var DATA = JSON.parse(document.getElementById('data').textContent);
+var COLORS = {M: '#4F81BD', F: '#000000', None: '#FFA500'};
+var LINES = {efficiency: '#0000FF', speed: '#00FFFF'};
+var GENDERS = {
+  M: "Men's", F: "Women's", B: "Men's and Women's",
+  None: "Combined Men's and Women's"};
+var STROKES = {
+  FLY: 'Butterfly', FREE: 'Freestyle', BREAST: 'Breaststroke',
+  BACK: 'Backstroke', MEDLEY: 'Individual Medley'};
+var CHARTS = [
+  {name: 'bmi_kgspeed', title: 'BMI vs. Swimming Efficiency',
+   x: 'speed_per_kg', y: 'bmi', xlabel: 'Speed / Kg (m/Kgs)',
+   ylabel: 'BMI'},
+  {name: 'bmi_speed', title: 'BMI vs. Speed', x: 'speed', y: 'bmi',
+   xlabel: 'Speed (m/s)', ylabel: 'BMI'},
+  {name: 'speed_kgspeed', title: 'Swimming Efficiency vs. Speed',
+   x: 'speed', y: 'speed_per_kg', xlabel: 'Speed',
+   ylabel: 'Speed / Kg (m/Kgs)'}];
+var MARGIN = {left: 70, right: 20, top: 60, bottom: 50};
+
+function label(gender) {
+  return GENDERS[gender].replace(/'s/g, '');
+}
+
+function series(event, gender) {
+  // Men's and women's values are drawn separately, combined values together
+  var result = [];
+  if (gender === 'B') {
+    ['M', 'F'].forEach(function (key) {
+      if (event.values[key]) {
+        result.push({gender: key, values: event.values[key]});
+      }
+    });
+  } else if (gender === 'None') {
+    var values = {};
+    Object.keys(event.values).forEach(function (key) {
+      Object.keys(event.values[key]).forEach(function (name) {
+        values[name] = (values[name] || []).concat(event.values[key][name]);
+      });
+    });
+    if (Object.keys(values).length) {
+      result.push({gender: 'None', values: values});
+    }
+  } else if (event.values[gender]) {
+    result.push({gender: gender, values: event.values[gender]});
+  }
+  return result;
+}
+
+function argmax(values) {
+  // Index of the largest value, skipping missing ones. -1 if there are none
+  var result = -1;
+  for (var i = 0; i < values.length; i++) {
+    if (values[i] === null) { continue; }
+    if (result === -1 || values[i] > values[result]) { result = i; }
+  }
+  return result;
+}
+
+function at(values, index) {
+  // Value at an index from argmax. null if it is missing
+  return index === -1 ? null : values[index];
+}
+
+function fixed(value) {
+  // Label text of a value that may be missing
+  return value === null ? 'N/A' : value.toFixed(3);
+}
+
+function fit(xs, ys) {
+  // Least squares linear trendline
+  var n = 0, sx = 0, sy = 0, sxx = 0, sxy = 0;
+  for (var i = 0; i < xs.length; i++) {
+    if (xs[i] === null || ys[i] === null) { continue; }
+    n++; sx += xs[i]; sy += ys[i]; sxx += xs[i] * xs[i]; sxy += xs[i] * ys[i];
+  }
+  var slope = (n * sxy - sx * sy) / (n * sxx - sx * sx);
+  return {slope: slope, intercept: (sy - slope * sx) / n};
+}
+
+function lines(chart, values) {
+  // Reference lines of charts of a single gender. Lines without a value
+  // to draw are left out
+  var x = values[chart.x], y = values[chart.y];
+  var bmi = values.bmi, speed = values.speed;
+  var result;
+  if (chart.name === 'bmi_speed') {
+    result = [{y: at(y, argmax(x)), color: LINES.speed,
+               label: 'BMI of Max Speed: ' + fixed(at(y, argmax(x)))}];
+  } else if (chart.name === 'bmi_kgspeed') {
+    result = [
+      {trend: fit(x, y), color: null, label: 'SEEL'},
+      {y: at(y, argmax(x)), color: LINES.efficiency,
+       label: 'BMI of Max Efficiency: ' + fixed(at(y, argmax(x)))},
+      {y: at(y, argmax(speed)), color: LINES.speed,
+       label: 'BMI of Max Speed: ' + fixed(at(y, argmax(speed)))}];
+  } else {
+    result = [
+      {y: at(y, argmax(y)), color: LINES.efficiency,
+       label: 'Max Efficiency (BMI: ' + fixed(at(bmi, argmax(y))) + ')'},
+      {y: at(y, argmax(x)), color: LINES.speed,
+       label: 'Efficiency at Max Speed (BMI: ' +
+         fixed(at(bmi, argmax(x))) + ')'}];
+  }
+  return result.filter(function (line) { return line.y !== null; });
+}
+
+function extent(values) {
+  var low = Infinity, high = -Infinity;
+  values.forEach(function (value) {
+    if (value === null) { return; }
+    low = Math.min(low, value); high = Math.max(high, value);
+  });
+  var pad = (high - low) * 0.05 || Math.abs(high) * 0.05 || 1;
+  return [low - pad, high + pad];
+}
+
+function ticks(range) {
+  var step = Math.pow(10, Math.floor(Math.log10((range[1] - range[0]) / 6)));
+  var span = (range[1] - range[0]) / step;
+  if (span > 30) { step *= 5; } else if (span > 12) { step *= 2; }
+  var result = [];
+  for (var tick = Math.ceil(range[0] / step) * step; tick <= range[1];
+       tick += step) {
+    result.push(Number(tick.toPrecision(12)));
+  }
+  return result;
+}
+
+function draw(canvas, chart, event, gender) {
+  var context = canvas.getContext('2d');
+  var width = canvas.width, height = canvas.height;
+  var data = series(event, gender);
+  var references = data.length === 1 ? lines(chart, data[0].values) : [];
+  var legend = [];
+  var xs = [], ys = [];
+
+  context.clearRect(0, 0, width, height);
+  context.fillStyle = '#000000';
+  context.textAlign = 'center';
+  context.font = '16px sans-serif';
+  context.fillText(
+    GENDERS[gender] + ' ' + event.distance + 'm ' + STROKES[event.stroke] +
+    ' (' + event.course + ')', width / 2, 24);
+  context.font = '12px sans-serif';
+  context.fillText(chart.title, width / 2, 44);
+  if (data.length === 0) {
+    context.fillText('No data', width / 2, height / 2);
+    return;
+  }
+
+  // Scale the axes to the values
+  data.forEach(function (item) {
+    xs = xs.concat(item.values[chart.x]);
+    ys = ys.concat(item.values[chart.y]);
+  });
+  references.forEach(function (line) {
+    if (line.y !== undefined) { ys.push(line.y); }
+  });
+  var xrange = extent(xs), yrange = extent(ys);
+  var right = width - MARGIN.right, bottom = height - MARGIN.bottom;
+  function px(value) {
+    return MARGIN.left + (value - xrange[0]) / (xrange[1] - xrange[0]) *
+      (right - MARGIN.left);
+  }
+  function py(value) {
+    return bottom - (value - yrange[0]) / (yrange[1] - yrange[0]) *
+      (bottom - MARGIN.top);
+  }
+
+  // Axes
+  context.strokeStyle = '#000000';
+  context.lineWidth = 1;
+  context.setLineDash([]);
+  context.strokeRect(MARGIN.left, MARGIN.top, right - MARGIN.left,
+                     bottom - MARGIN.top);
+  ticks(xrange).forEach(function (tick) {
+    context.fillText(String(tick), px(tick), bottom + 16);
+  });
+  context.textAlign = 'right';
+  ticks(yrange).forEach(function (tick) {
+    context.fillText(String(tick), MARGIN.left - 6, py(tick) + 4);
+  });
+  context.textAlign = 'center';
+  context.fillText(chart.xlabel, (MARGIN.left + right) / 2, height - 12);
+  context.save();
+  context.translate(14, (MARGIN.top + bottom) / 2);
+  context.rotate(-Math.PI / 2);
+  context.fillText(chart.ylabel, 0, 0);
+  context.restore();
+
+  // Points
+  context.save();
+  context.beginPath();
+  context.rect(MARGIN.left, MARGIN.top, right - MARGIN.left,
+               bottom - MARGIN.top);
+  context.clip();
+  context.globalAlpha = 0.5;
+  data.forEach(function (item) {
+    var x = item.values[chart.x], y = item.values[chart.y];
+    context.fillStyle = COLORS[item.gender];
+    for (var i = 0; i < x.length; i++) {
+      if (x[i] === null || y[i] === null) { continue; }
+      context.beginPath();
+      context.arc(px(x[i]), py(y[i]), 3, 0, 2 * Math.PI);
+      context.fill();
+    }
+    legend.push({label: label(item.gender), color: COLORS[item.gender]});
+  });
+  context.globalAlpha = 1;
+
+  // Reference lines
+  references.forEach(function (line) {
+    context.beginPath();
+    if (line.trend) {
+      context.strokeStyle = COLORS[data[0].gender];
+      context.setLineDash([]);
+      context.moveTo(px(xrange[0]),
+                     py(line.trend.slope * xrange[0] + line.trend.intercept));
+      context.lineTo(px(xrange[1]),
+                     py(line.trend.slope * xrange[1] + line.trend.intercept));
+    } else {
+      context.strokeStyle = line.color;
+      context.setLineDash([6, 4]);
+      context.moveTo(MARGIN.left, py(line.y));
+      context.lineTo(right, py(line.y));
+    }
+    context.stroke();
+    legend.push({label: line.label, color: line.color ||
+                 COLORS[data[0].gender], line: true});
+  });
+  context.restore();
+
+  // Legend
+  context.textAlign = 'left';
+  legend.forEach(function (item, index) {
+    var y = MARGIN.top + 16 + index * 16;
+    context.fillStyle = item.color;
+    context.strokeStyle = item.color;
+    if (item.line) {
+      context.beginPath();
+      context.moveTo(right - 220, y - 4);
+      context.lineTo(right - 200, y - 4);
+      context.stroke();
+    } else {
+      context.beginPath();
+      context.arc(right - 210, y - 4, 4, 0, 2 * Math.PI);
+      context.fill();
+    }
+    context.fillStyle = '#000000';
+    context.fillText(item.label, right - 194, y);
+  });
+}
+
+function update() {
+  var event = DATA.events[document.getElementById('event').value];
+  var gender = document.getElementById('gender').value;
+  var canvases = document.getElementById('charts').children;
+  CHARTS.forEach(function (chart, index) {
+    draw(canvases[index], chart, event, gender);
+  });
+}
+
+DATA.events.forEach(function (event, index) {
+  var option = document.createElement('option');
+  option.value = index;
+  option.text = event.course + ' ' + event.distance + 'm ' +
+    STROKES[event.stroke];
+  document.getElementById('event').appendChild(option);
+});
+CHARTS.forEach(function () {
+  var canvas = document.createElement('canvas');
+  canvas.width = 640;
+  canvas.height = 480;
+  document.getElementById('charts').appendChild(canvas);
+});
+document.getElementById('event').onchange = update;
+document.getElementById('gender').onchange = update;
+update();
+</script>
+</body>
+</html>
+'''
+
+
+def write(filename, databases, events):
+    """Create an HTML file with the charts of every event.
+
+    Args:
+        filename: Name of HTML file
+        databases: Dict of graph.Data objects keyed by course
+        events: List of tuples of (course, stroke, distance)
+
+    Returns:
+        None
+
+    """
+    # Initialize key variables
+    data = {'events': []}
+
+    # Store the values of each gender of an event once
+    for (course, stroke, distance) in events:
+        database = databases[course]
+        values = {}
+        for gender in database.genders(stroke, distance):
+            values[gender] = {
+                'bmi': _values(database.bmi(stroke, distance, gender)),
+                'speed': _values(database.speed(stroke, distance, gender)),
+                'speed_per_kg': _values(
+                    database.kgspeed(stroke, distance, gender))}
+        data['events'].append({
+            'course': course, 'stroke': stroke, 'distance': distance,
+            'values': values})
+
+    # Don't let the data end the script element early. _values has already
+    # replaced NaN and Infinity, which JSON.parse doesn't accept, with None
+    blob = json.dumps(
+        data, separators=(',', ':'), allow_nan=False).replace('</', '<\\/')
+
+    # Create output file
+    with open(filename, 'w') as f_handle:
+        f_handle.write(_TEMPLATE.replace('__DATA__', blob))
+
+
+def _values(array):
+    """Convert an array of measurements to a compact list.
+
+    Args:
+        array: Array of measurements
+
+    Returns:
+        data: List of floats with DIGITS significant digits. None for NaN
+            and infinite values
+
+    """
+    # Convert
+    finite = np.isfinite(array).tolist()
+    data = [
+        float('{:.{}g}'.format(value, DIGITS)) if ok is True else None
+        for (value, ok) in zip(array.tolist(), finite)]
+    return data
@@ -0,0 +1,107 @@
+"""Module to cache results extracted from meet files."""
+
+# Standard imports
+import os
+import hashlib
+import pickle
+import tempfile
+
+# Fina imports
+from fina import results
+
+
+class Cache(object):
+    """Store results extracted from meet files on disk.
+
+    Entries are keyed by a hash of the meet file's contents and the version
+    of the rows created by the parsers. Cached rows don't contain any athlete
+    profile data, so they remain valid when profiles change.
+
+    """
+
+    def __init__(self, directory):
+        """Method to instantiate the class.
+
+        Args:
+            directory: Name of directory in which results are cached
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._directory = directory
+
+        # Create the directory if necessary
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, filename):
+        """Create the cache key for a meet file.
+
+        Args:
+            filename: Name of meet file
+
+        Returns:
+            result: Key
+
+        """
+        # Hash the file contents
+        hasher = hashlib.sha256()
+        with open(filename, 'rb') as reader:
+            for chunk in iter(lambda: reader.read(1048576), b''):
+                hasher.update(chunk)
+        result = '{}-{}'.format(hasher.hexdigest(), results.RAW_VERSION)
+        return result
+
+    def read(self, key):
+        """Read cached results.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            data: List of lists with information. None if not cached
+
+        """
+        # Initialize key variables
+        data = None
+        filename = self._filename(key)
+
+        # Read data
+        if os.path.isfile(filename) is True:
+            with open(filename, 'rb') as reader:
+                data = pickle.load(reader)
+        return data
+
+    def write(self, key, data):
+        """Write results to the cache.
+
+        Args:
+            key: Cache key
+            data: List of lists with information
+
+        Returns:
+            None
+
+        """
+        # Write to a temporary file first so that other processes never
+        # read a partially written file
+        (handle, tmp_filename) = tempfile.mkstemp(dir=self._directory)
+        with os.fdopen(handle, 'wb') as writer:
+            pickle.dump(data, writer, protocol=5)
+        os.replace(tmp_filename, self._filename(key))
+
+    def _filename(self, key):
+        """Get the name of the file used to cache results.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            result: Filename
+
+        """
+        # Return
+        result = '{}{}{}.pickle'.format(
+            self._directory.rstrip(os.sep), os.sep, key)
+        return result
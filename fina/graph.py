@@ -1,29 +1,50 @@
 """Module to process FINA results files."""
 
 # Standard imports
-import csv
-import hashlib
 from collections import defaultdict
-import numpy as np
-import math
-from pprint import pprint
+import hashlib
 
 # pip3 imports
+import numpy as np
+import matplotlib
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.colors import LinearSegmentedColormap
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
 # Fina imports
 from fina import log
-log
+from fina import identity
+from fina import store
+
+# Version of the way charts are drawn. Change it to redraw all charts
+CHART_VERSION = 1
+
+# Charts with more points than this are drawn as densities by default
+DENSITY_THRESHOLD = 10000
+
+# Number of points drawn over density charts by default
+SAMPLE_SIZE = 500
+
+# Measurements of events without results
+_EMPTY = {
+    'bmi': np.array([]),
+    'speed': np.array([]),
+    'speed_per_kg': np.array([])}
+
 
 class Data(object):
     """Process Database data."""
 
-    def __init__(self, filename, fastest=True, course=None):
+    def __init__(self, filename, fastest=True, course=None, results=None):
         """Method to instantiate the class.
 
         Args:
             filename: Name of file to process
             fastest: Only plot the fastest times for each athlete if True
+            course: Course to filter by
+            results: Table object already read from the file. The file is
+                read if None
 
         Returns:
             None
@@ -34,11 +55,13 @@ class Data(object):
         self._fastest = fastest
 
         # Generate globally necessary data
-        self._events = self._read_database(course=course)
-        self._superkeys = sorted(self._events.keys())
+        (self._events, self._identities) = self._read_database(
+            course=course, results=results)
+        self._ids = sorted(self._events.keys())
+        self._index = self._group()
 
     def bmi(self, stroke, distance, gender):
-        """Return list of bmi values sorted by superkey.
+        """Return list of bmi values sorted by athlete id.
 
         Args:
             stroke: Stroke Name
@@ -46,7 +69,7 @@ class Data(object):
             gender: gender of Participants
 
         Returns:
-            data: list of BMIs
+            data: Array of BMIs
 
         """
         # Initialize key variables
@@ -55,7 +78,7 @@ class Data(object):
         return data
 
     def speed(self, stroke, distance, gender):
-        """Return list of speed values sorted by superkey.
+        """Return list of speed values sorted by athlete id.
 
         Args:
             stroke: Stroke Name
@@ -63,7 +86,7 @@ class Data(object):
             gender: gender of Participants
 
         Returns:
-            data: list of BMIs
+            data: Array of BMIs
 
         """
         # Initialize key variables
@@ -72,7 +95,7 @@ class Data(object):
         return data
 
     def sq_speed(self, stroke, distance, gender):
-        """Return list of square rood speed values sorted by superkey.
+        """Return list of square rood speed values sorted by athlete id.
 
         Args:
             stroke: Stroke Name
@@ -80,17 +103,17 @@ class Data(object):
             gender: gender of Participants
 
         Returns:
-            data: list of BMIs
+            data: Array of BMIs
 
         """
         # Initialize key variables
         measurement = 'speed'
         _data = self._measurements(stroke, distance, gender, measurement)
-        data = [_ * _ for _ in _data]
+        data = np.square(_data)
         return data
 
     def sqrt_speed(self, stroke, distance, gender):
-        """Return list of square rood speed values sorted by superkey.
+        """Return list of square rood speed values sorted by athlete id.
 
         Args:
             stroke: Stroke Name
@@ -98,17 +121,17 @@ class Data(object):
             gender: gender of Participants
 
         Returns:
-            data: list of BMIs
+            data: Array of BMIs
 
         """
         # Initialize key variables
         measurement = 'speed'
         _data = self._measurements(stroke, distance, gender, measurement)
-        data = [math.sqrt(_) for _ in _data]
+        data = np.sqrt(_data)
         return data
 
     def kgspeed(self, stroke, distance, gender):
-        """Return list of speed values sorted by superkey.
+        """Return list of speed values sorted by athlete id.
 
         Args:
             stroke: Stroke Name
@@ -116,7 +139,7 @@ class Data(object):
             gender: gender of Participants
 
         Returns:
-            data: list of BMIs
+            data: Array of BMIs
 
         """
         # Initialize key variables
@@ -124,8 +147,76 @@ class Data(object):
         data = self._measurements(stroke, distance, gender, measurement)
         return data
 
+    def groups(self):
+        """Get the events and genders that have results.
+
+        Args:
+            None
+
+        Returns:
+            data: List of tuples of (stroke, distance, gender) sorted by
+                stroke, distance and gender. The gender None is for the
+                results of any gender and is last for each event
+
+        """
+        # Sort
+        data = sorted(
+            self._index.keys(), key=lambda key: (
+                key[0], float(key[1]), key[2] is None, key[2] or ''))
+        return data
+
+    def genders(self, _stroke, _distance):
+        """Get the genders of the participants of an event.
+
+        Args:
+            _stroke: Stroke Name
+            _distance: Distance of Event
+
+        Returns:
+            data: Sorted list of genders
+
+        """
+        # Initialize key variables
+        stroke = _stroke.upper()
+        distance = str(float(_distance)).replace('.0', '')
+
+        # Get the genders from the index
+        data = sorted([
+            key[2] for key in self._index.keys()
+            if key[:2] == (stroke, distance) and key[2] is not None])
+        return data
+
+    def anonymized(self):
+        """Get the best results of each athlete without their names.
+
+        Args:
+            None
+
+        Returns:
+            data: List of lists of anonymous athlete id, stroke, distance,
+                gender, bmi, speed per kg and speed sorted by anonymous
+                athlete id
+
+        """
+        # Initialize key variables
+        data = []
+
+        for _id in self._ids:
+            superkey = identity.anonymize(self._identities.key(_id))
+            for stroke, distances in self._events[_id].items():
+                for distance, genders in distances.items():
+                    for gender in sorted(genders.keys()):
+                        values = genders[gender]
+                        data.append([
+                            superkey, stroke, distance, gender,
+                            values['bmi'], values['speed_per_kg'],
+                            values['speed']])
+
+        data.sort(key=lambda row: row[0])
+        return data
+
     def _measurements(self, _stroke, _distance, gender, measurement):
-        """Return list of bmi values sorted by superkey.
+        """Return list of bmi values sorted by athlete id.
 
         Args:
             _stroke: Stroke Name
@@ -134,112 +225,130 @@ class Data(object):
             measurement: Measure to get
 
         Returns:
-            data: list of BMIs
+            data: Array of BMIs
 
         """
         # Initialize key variables
         stroke = _stroke.upper()
         distance = str(float(_distance)).replace('.0', '')
-        data = []
-
-        for superkey in self._superkeys:
-            if gender is None:
-                if stroke in self._events[superkey]:
-                    if distance in self._events[superkey][stroke]:
-                        # Get value for any gender
-                        for gender_key in sorted(
-                                self._events[
-                                    superkey][stroke][distance].keys()):
-                            value = self._events[superkey][
-                                stroke][distance][gender_key][measurement]
-                            data.append(value)
-            else:
-                if stroke in self._events[superkey]:
-                    if distance in self._events[superkey][stroke]:
-                        if gender in self._events[superkey][stroke][distance]:
-                            value = self._events[superkey][
-                                stroke][distance][gender][measurement]
-                            data.append(value)
 
+        # Get the values from the index
+        data = self._index.get((stroke, distance, gender), _EMPTY)[
+            measurement]
         return data
 
-    def _read_database(self, course=None):
+    def _group(self):
+        """Create arrays of measurements for each event and gender.
+
+        Args:
+            None
+
+        Returns:
+            index: Dict of dicts of read only arrays keyed by stroke,
+                distance and gender, then measurement. The values of the
+                athletes are sorted by id. The gender None has the values
+                for any gender
+
+        """
+        # Initialize key variables
+        values = defaultdict(lambda: defaultdict(list))
+        index = {}
+
+        for _id in self._ids:
+            for stroke, distances in self._events[_id].items():
+                for distance, genders in distances.items():
+                    for gender in sorted(genders.keys()):
+                        for key in [
+                                (stroke, distance, gender),
+                                (stroke, distance, None)]:
+                            for measurement, value in genders[
+                                    gender].items():
+                                values[key][measurement].append(value)
+
+        # Convert to arrays
+        for key, measurements in values.items():
+            index[key] = {}
+            for measurement, _values in measurements.items():
+                array = np.array(_values, dtype=np.float64)
+                array.flags.writeable = False
+                index[key][measurement] = array
+
+        return index
+
+    def _read_database(self, course=None, results=None):
         """Process the database file.
 
         Args:
             course: Course to filter by
+            results: Table object already read from the file. The file is
+                read if None
 
         Returns:
-            events: Anonymized dict of best results per athlete keyed by
-                hash, stroke, distance and gender
+            data: Tuple of (dict of best results per athlete keyed by id,
+                stroke, distance and gender, Interner of athlete keys)
 
         """
         # Initialize key variables
-        filename = self._filename
-        athletes = {}
-        delimiter = '|'
-        events = defaultdict(lambda: defaultdict(
-            lambda: defaultdict(lambda: defaultdict())))
-
-        # Read CSV file
-        header = True
-        with open(filename) as csvfile:
-            f_handle = csv.reader(csvfile, delimiter=delimiter)
-            for row in f_handle:
-                # Skip the header
-                if header is True:
-                    header = False
-                    continue
-
-                # Filter by course type
-                if course is not None:
-                    course_type = row[3].upper()
-                    if course_type != course.upper():
-                        continue
-
-                # Contiue processing the row
-                (_, _, _, _, _, _time, _, superkey) = _process_row(
-                    row, fastest=self._fastest)
-
-                # Get the fastest time for each athlete (minimum duration)
-                if superkey in athletes:
-                    athletes[superkey] = min(_time, athletes[superkey])
-                else:
-                    athletes[superkey] = _time
-
-        # Read CSV file again
-        header = True
-        with open(filename) as csvfile:
-            f_handle = csv.reader(csvfile, delimiter=delimiter)
-            for row in f_handle:
-                # Skip the header
-                if header is True:
-                    header = False
-                    continue
-
-                # Filter by course type (Again)
-                if course is not None:
-                    course_type = row[3].upper()
-                    if course_type != course.upper():
-                        continue
-
-                (_, _, gender, stroke,
-                 distance, _time, data, superkey) = _process_row(
-                    row, fastest=self._fastest)
-                if athletes[superkey] == _time:
-                    events[superkey][stroke][distance][gender] = data
-
-        return events
+        identities = identity.Interner()
+        events = {}
+
+        # Read the database file
+        if results is None:
+            results = store.read(self._filename, course=course)
+        elif course is not None:
+            results = results.matching('course', course)
+        strokes = results.column('stroke').values()
+        genders = results.column('gender').values()
+        times = results.column('time')
+        measurements = {
+            name: results.column(name).tolist()
+            for name in ['bmi', 'speed_per_kg', 'speed']}
+        (keys, distances) = _keys(results, fastest=self._fastest)
+
+        # Get the fastest time for each athlete (minimum duration) for all
+        # athletes at once
+        ids = identities.intern_all(keys)
+        best = np.full(len(identities), np.inf)
+        np.minimum.at(best, ids, times)
+        fastest = np.flatnonzero(times == best[ids]).tolist()
+
+        # Keep the last result with the fastest time for each gender
+        ids = ids.tolist()
+        for index in fastest:
+            events.setdefault(ids[index], {}).setdefault(
+                strokes[index], {}).setdefault(distances[index], {})[
+                    genders[index]] = {
+                        name: values[index]
+                        for name, values in measurements.items()}
+
+        data = (events, identities)
+        return data
 
 
 class Graph(object):
-    """Create graphs."""
+    """Create graphs.
+
+    Charts saved to files are drawn on a figure owned by the object instead
+    of the pyplot figures, so that many charts can be created by the same
+    process. Objects must not be shared between threads.
 
-    def __init__(self, filename, fastest=True, course=None):
+    """
+
+    def __init__(
+            self, filename, fastest=True, course=None, database=None,
+            threshold=DENSITY_THRESHOLD, sample_size=SAMPLE_SIZE):
         """Method to instantiate the class.
 
         Args:
             filename: Name of file to process
+            fastest: Only plot the fastest times for each athlete if True
+            course: Course to filter by
+            database: Data object for the course. The file is read if None
+            threshold: Draw the density of the values of a gender instead
+                of each point if there are more values than this. Always
+                draw points if None
+            sample_size: Number of randomly selected points to draw over
+                densities. No points are drawn if 0
 
         Returns:
             None
@@ -247,9 +356,14 @@ class Graph(object):
         """
         # Initialize key variables
         self.course = course
+        self._threshold = threshold
+        self._sample_size = sample_size
 
         # Create lookup tables
-        self._database = Data(filename, fastest=fastest, course=self.course)
+        if database is None:
+            database = Data(filename, fastest=fastest, course=self.course)
+        self._database = database
+        self._figure = None
         self._strokes = {
             'FLY': 'FLY',
             'BUT': 'FLY',
@@ -282,6 +396,151 @@ class Graph(object):
             'speed': '#00FFFF'
         }
 
+    def digest(self, chart, _stroke, distance, gender=None):
+        """Create a digest of everything used to draw a chart.
+
+        Args:
+            chart: Name of the method that draws the chart
+            _stroke: Event stroke
+            distance: Event distance
+            gender: Gender of participants
+
+        Returns:
+            result: SHA-256 hex digest
+
+        """
+        # Initialize key variables
+        (stroke, _gender, title) = self._shared(_stroke, distance, gender)
+        hasher = hashlib.sha256()
+        if _gender == 'B':
+            genders = ['M', 'F']
+        else:
+            genders = [_gender]
+
+        # Hash the plotting parameters
+        parameters = repr((
+            CHART_VERSION, matplotlib.__version__, chart, title,
+            self._colors_gender, self._colors_line, self._threshold,
+            self._sample_size))
+        hasher.update(bytes(parameters, 'utf-8'))
+
+        # Hash the values of each gender on the chart
+        for next_gender in genders:
+            for values in [
+                    self._database.bmi(stroke, distance, next_gender),
+                    self._database.speed(stroke, distance, next_gender),
+                    self._database.kgspeed(stroke, distance, next_gender)]:
+                hasher.update(bytes(str(len(values)), 'utf-8'))
+                hasher.update(values.tobytes())
+
+        result = hasher.hexdigest()
+        return result
+
+    def _axes(self, filename=None):
+        """Get empty axes to draw a chart on.
+
+        Args:
+            filename: Filename to create. The chart is displayed on your
+                desktop if None
+
+        Returns:
+            result: Tuple of (Figure, Axes)
+
+        """
+        # Displayed charts need a pyplot window
+        if filename is None:
+            figure = plt.figure()
+            result = (figure, figure.add_subplot())
+            return result
+
+        # Reuse the same figure for every file
+        if self._figure is None:
+            self._figure = Figure()
+            FigureCanvasAgg(self._figure)
+            self._figure.add_subplot()
+        axes = self._figure.axes[0]
+        axes.clear()
+        result = (self._figure, axes)
+        return result
+
+    def _scatter(self, axes, x_values, y_values, gender):
+        """Draw the values of a gender as points or as a density.
+
+        Args:
+            axes: Axes to draw on
+            x_values: Array of x values
+            y_values: Array of y values
+            gender: Gender of participants
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        color = self._colors_gender[gender]
+        label = self._title_gender[gender].replace('\'s', '')
+
+        # Draw each point if there are few
+        if self._threshold is None or len(x_values) <= self._threshold:
+            axes.scatter(
+                x_values, y_values,
+                marker='o',
+                facecolors=color,
+                alpha=0.5,
+                label=label)
+            return
+
+        # Otherwise the time to draw the chart would grow with the number
+        # of points. Draw the number of points in each bin instead
+        finite = np.isfinite(x_values) & np.isfinite(y_values)
+        x_values = x_values[finite]
+        y_values = y_values[finite]
+        colormap = LinearSegmentedColormap.from_list(
+            'density', ['#FFFFFF', color])
+        axes.hexbin(
+            x_values, y_values,
+            gridsize=50,
+            mincnt=1,
+            cmap=colormap,
+            alpha=0.5)
+
+        # Bins are shaded, so use a point in the legend instead
+        axes.scatter(
+            [], [],
+            marker='o',
+            facecolors=color,
+            alpha=0.5,
+            label=label)
+
+        # Draw a sample of the points over the bins
+        if bool(self._sample_size) is True:
+            indices = _sample(len(x_values), self._sample_size)
+            axes.scatter(
+                x_values[indices], y_values[indices],
+                marker='.',
+                s=4,
+                color=color,
+                alpha=0.5)
+
+    def _show(self, figure, filename=None):
+        """Display a chart or save it to a file.
+
+        Args:
+            figure: Figure of the chart
+            filename: Filename to create. The chart is displayed on your
+                desktop if None
+
+        Returns:
+            None
+
+        """
+        # Display plot
+        if filename is None:
+            plt.show()
+            plt.close(figure)
+        else:
+            figure.savefig(filename)
+
     def _shared(self, _stroke, distance, gender=None):
         """Plot BMI vs Speed for a given event and gender.
 
@@ -370,6 +629,8 @@ class Graph(object):
             log.log2warning(1007, log_message)
             return
 
+        (figure, axes) = self._axes(filename)
+
         '''
         Create plot object in memory.
 
@@ -379,39 +640,29 @@ class Graph(object):
          edgecolors:
             The string ‘none’ to plot faces with no outlines
         '''
-        plt.scatter(
-            x_values, y_values,
-            marker='o',
-            facecolors=self._colors_gender[_gender],
-            alpha=0.5,
-            label=self._title_gender[_gender].replace('\'s', ''))
+        self._scatter(axes, x_values, y_values, _gender)
 
         # Horizontal line at maximum speed y value
-        speed_max = max(x_values)
-        bmi_of_max_speed = y_values[x_values.index(speed_max)]
-        plt.axhline(
+        bmi_of_max_speed = y_values[np.argmax(x_values)]
+        axes.axhline(
             y=bmi_of_max_speed,
             label=('BMI of Max Speed: {0:.3f}'.format(bmi_of_max_speed)),
             linestyle='dashed',
             linewidth=1, color=self._colors_line['speed'])
 
         # Create plot title
-        plt.suptitle(title)
-        plt.title('BMI vs. Speed', fontsize='smaller')
+        figure.suptitle(title)
+        axes.set_title('BMI vs. Speed', fontsize='smaller')
 
         # Create plot legend based on plot label
-        plt.legend()
+        axes.legend()
 
         # Create Axes labels
-        plt.xlabel('Speed (m/s)')
-        plt.ylabel('BMI')
+        axes.set_xlabel('Speed (m/s)')
+        axes.set_ylabel('BMI')
 
         # Display plot
-        if filename is None:
-            plt.show()
-        else:
-            plt.savefig(filename)
-        plt.close()
+        self._show(figure, filename)
 
     def _bmi_speed_2(self, _stroke, distance, filename=None):
         """Plot BMI vs Speed for a given event and gender.
@@ -438,6 +689,8 @@ class Graph(object):
                 'y': self._database.bmi(stroke, distance, gender)
             }
 
+        (figure, axes) = self._axes(filename)
+
         '''
         Create plot object in memory.
 
@@ -450,30 +703,21 @@ class Graph(object):
         for gender in genders:
             x_values = data[gender]['x']
             y_values = data[gender]['y']
-            plt.scatter(
-                x_values, y_values,
-                marker='o',
-                facecolors=self._colors_gender[gender],
-                alpha=0.5,
-                label=self._title_gender[gender].replace('\'s', ''))
+            self._scatter(axes, x_values, y_values, gender)
 
         # Create plot title
-        plt.suptitle(title)
-        plt.title('BMI vs. Speed', fontsize='smaller')
+        figure.suptitle(title)
+        axes.set_title('BMI vs. Speed', fontsize='smaller')
 
         # Create plot legend based on plot label
-        plt.legend()
+        axes.legend()
 
         # Create Axes labels
-        plt.xlabel('Speed (m/s)')
-        plt.ylabel('BMI')
+        axes.set_xlabel('Speed (m/s)')
+        axes.set_ylabel('BMI')
 
         # Display plot
-        if filename is None:
-            plt.show()
-        else:
-            plt.savefig(filename)
-        plt.close()
+        self._show(figure, filename)
 
     def bmi_kgspeed(self, _stroke, distance, gender=None, filename=None):
         """Plot BMI vs Speed for a given event and gender.
@@ -524,6 +768,8 @@ class Graph(object):
             log.log2warning(1008, log_message)
             return
 
+        (figure, axes) = self._axes(filename)
+
         '''
         Create plot object in memory.
 
@@ -533,20 +779,15 @@ class Graph(object):
          edgecolors:
             The string ‘none’ to plot faces with no outlines
         '''
-        plt.scatter(
-            x_values, y_values,
-            marker='o',
-            facecolors=self._colors_gender[_gender],
-            alpha=0.5,
-            label=self._title_gender[_gender].replace('\'s', ''))
+        self._scatter(axes, x_values, y_values, _gender)
 
         # Create plot title
-        plt.suptitle(title)
-        plt.title('BMI vs. Swimming Efficiency', fontsize='smaller')
+        figure.suptitle(title)
+        axes.set_title('BMI vs. Swimming Efficiency', fontsize='smaller')
 
         # Create linear trendline (linear fitting)
         function = np.poly1d(np.polyfit(x_values, y_values, 1))
-        plt.plot(
+        axes.plot(
             x_values, function(x_values),
             color=self._colors_gender[_gender],
             linestyle='solid',
@@ -555,9 +796,8 @@ class Graph(object):
             antialiased=False)
 
         # Horizontal line at minimum y value
-        x_max = max(x_values)
-        bmi_of_max_efficiency = y_values[x_values.index(x_max)]
-        plt.axhline(
+        bmi_of_max_efficiency = y_values[np.argmax(x_values)]
+        axes.axhline(
             y=bmi_of_max_efficiency,
             label=(
                 'BMI of Max Efficiency: {0:.3f}'
@@ -567,9 +807,8 @@ class Graph(object):
             color=self._colors_line['efficiency'])
 
         # Horizontal line at maximum speed y value
-        speed_max = max(speeds)
-        bmi_of_max_speed = y_values[speeds.index(speed_max)]
-        plt.axhline(
+        bmi_of_max_speed = y_values[np.argmax(speeds)]
+        axes.axhline(
             y=bmi_of_max_speed,
             label=('BMI of Max Speed: {0:.3f}'.format(bmi_of_max_speed)),
             linestyle='dashed',
@@ -577,18 +816,14 @@ class Graph(object):
             color=self._colors_line['speed'])
 
         # Create plot legend based on plot label
-        plt.legend()
+        axes.legend()
 
         # Create Axes labels
-        plt.xlabel('Speed / Kg (m/Kgs)')
-        plt.ylabel('BMI')
+        axes.set_xlabel('Speed / Kg (m/Kgs)')
+        axes.set_ylabel('BMI')
 
         # Display plot
-        if filename is None:
-            plt.show()
-        else:
-            plt.savefig(filename)
-        plt.close()
+        self._show(figure, filename)
 
     def _bmi_kgspeed_2(self, _stroke, distance, filename=None):
         """Plot BMI vs Speed for a given event and both genders.
@@ -615,6 +850,8 @@ class Graph(object):
                 'speed': self._database.speed(stroke, distance, gender)
             }
 
+        (figure, axes) = self._axes(filename)
+
         '''
         Create plot object in memory.
 
@@ -627,30 +864,21 @@ class Graph(object):
         for gender in genders:
             x_values = data[gender]['x']
             y_values = data[gender]['y']
-            plt.scatter(
-                x_values, y_values,
-                marker='o',
-                facecolors=self._colors_gender[gender],
-                alpha=0.5,
-                label=self._title_gender[gender].replace('\'s', ''))
+            self._scatter(axes, x_values, y_values, gender)
 
         # Create plot title
-        plt.suptitle(title)
-        plt.title('BMI vs. Swimming Efficiency', fontsize='smaller')
+        figure.suptitle(title)
+        axes.set_title('BMI vs. Swimming Efficiency', fontsize='smaller')
 
         # Create plot legend based on plot label
-        plt.legend()
+        axes.legend()
 
         # Create Axes labels
-        plt.xlabel('Speed / Kg (m/Kgs)')
-        plt.ylabel('BMI')
+        axes.set_xlabel('Speed / Kg (m/Kgs)')
+        axes.set_ylabel('BMI')
 
         # Display plot
-        if filename is None:
-            plt.show()
-        else:
-            plt.savefig(filename)
-        plt.close()
+        self._show(figure, filename)
 
     def speed_kgspeed(self, _stroke, distance, gender=None, filename=None):
         """Plot Speed / Kg vs Speed for a given event and gender.
@@ -702,6 +930,8 @@ class Graph(object):
             log.log2warning(1009, log_message)
             return
 
+        (figure, axes) = self._axes(filename)
+
         '''
         Create plot object in memory.
 
@@ -711,18 +941,12 @@ class Graph(object):
          edgecolors:
             The string ‘none’ to plot faces with no outlines
         '''
-        plt.scatter(
-            x_values, y_values,
-            marker='o',
-            facecolors=self._colors_gender[_gender],
-            alpha=0.5,
-            label=self._title_gender[_gender].replace('\'s', ''))
+        self._scatter(axes, x_values, y_values, _gender)
 
         # Horizontal line at maximum efficiency y value
         y_max = max(y_values)
-        x_max = max(x_values)
-        bmi_of_max_efficiency = bmis[y_values.index(y_max)]
-        plt.axhline(
+        bmi_of_max_efficiency = bmis[np.argmax(y_values)]
+        axes.axhline(
             y=y_max,
             label=(
                 'Max Efficiency (BMI: {0:.3f})'
@@ -732,9 +956,9 @@ class Graph(object):
             color=self._colors_line['efficiency'])
 
         # Horizontal line at maximum speed y value
-        bmi_of_max_speed = bmis[x_values.index(x_max)]
-        plt.axhline(
-            y=y_values[x_values.index(x_max)],
+        bmi_of_max_speed = bmis[np.argmax(x_values)]
+        axes.axhline(
+            y=y_values[np.argmax(x_values)],
             label=(
                 'Efficiency at Max Speed (BMI: {0:.3f})'
                 ''.format(bmi_of_max_speed)),
@@ -743,22 +967,18 @@ class Graph(object):
             color=self._colors_line['speed'])
 
         # Create plot title
-        plt.suptitle(title)
-        plt.title('Swimming Efficiency vs. Speed', fontsize='smaller')
+        figure.suptitle(title)
+        axes.set_title('Swimming Efficiency vs. Speed', fontsize='smaller')
 
         # Create plot legend based on plot label
-        plt.legend()
+        axes.legend()
 
         # Create Axes labels
-        plt.xlabel('Speed')
-        plt.ylabel('Speed / Kg (m/Kgs)')
+        axes.set_xlabel('Speed')
+        axes.set_ylabel('Speed / Kg (m/Kgs)')
 
         # Display plot
-        if filename is None:
-            plt.show()
-        else:
-            plt.savefig(filename)
-        plt.close()
+        self._show(figure, filename)
 
     def _speed_kgspeed_2(self, _stroke, distance, filename=None):
         """Plot Speed / Kg vs Speed for a given event and gender.
@@ -785,6 +1005,8 @@ class Graph(object):
                 'bmis': self._database.bmi(stroke, distance, gender)
             }
 
+        (figure, axes) = self._axes(filename)
+
         '''
         Create plot object in memory.
 
@@ -797,30 +1019,21 @@ class Graph(object):
         for gender in genders:
             x_values = data[gender]['x']
             y_values = data[gender]['y']
-            plt.scatter(
-                x_values, y_values,
-                marker='o',
-                facecolors=self._colors_gender[gender],
-                alpha=0.5,
-                label=self._title_gender[gender].replace('\'s', ''))
+            self._scatter(axes, x_values, y_values, gender)
 
         # Create plot title
-        plt.suptitle(title)
-        plt.title('Swimming Efficiency vs. Speed', fontsize='smaller')
+        figure.suptitle(title)
+        axes.set_title('Swimming Efficiency vs. Speed', fontsize='smaller')
 
         # Create plot legend based on plot label
-        plt.legend()
+        axes.legend()
 
         # Create Axes labels
-        plt.xlabel('Speed')
-        plt.ylabel('Speed / Kg (m/Kgs)')
+        axes.set_xlabel('Speed')
+        axes.set_ylabel('Speed / Kg (m/Kgs)')
 
         # Display plot
-        if filename is None:
-            plt.show()
-        else:
-            plt.savefig(filename)
-        plt.close()
+        self._show(figure, filename)
 
     def bmi_sqrt_speed(self, _stroke, distance, gender=None, filename=None):
         """Plot BMI vs Square Root of Speed for a given event and gender.
@@ -871,6 +1084,8 @@ class Graph(object):
             log.log2warning(1007, log_message)
             return
 
+        (figure, axes) = self._axes(filename)
+
         '''
         Create plot object in memory.
 
@@ -880,30 +1095,21 @@ class Graph(object):
          edgecolors:
             The string ‘none’ to plot faces with no outlines
         '''
-        plt.scatter(
-            x_values, y_values,
-            marker='o',
-            facecolors=self._colors_gender[_gender],
-            alpha=0.5,
-            label=self._title_gender[_gender].replace('\'s', ''))
+        self._scatter(axes, x_values, y_values, _gender)
 
         # Create plot title
-        plt.suptitle(title)
-        plt.title('BMI vs. Square Root Speed', fontsize='smaller')
+        figure.suptitle(title)
+        axes.set_title('BMI vs. Square Root Speed', fontsize='smaller')
 
         # Create plot legend based on plot label
-        plt.legend()
+        axes.legend()
 
         # Create Axes labels
-        plt.xlabel('Square Root Speed (m/s)')
-        plt.ylabel('BMI')
+        axes.set_xlabel('Square Root Speed (m/s)')
+        axes.set_ylabel('BMI')
 
         # Display plot
-        if filename is None:
-            plt.show()
-        else:
-            plt.savefig(filename)
-        plt.close()
+        self._show(figure, filename)
 
     def _bmi_sqrt_speed_2(self, _stroke, distance, filename=None):
         """Plot BMI vs Square Root of Speed for a given event and gender.
@@ -930,6 +1136,8 @@ class Graph(object):
                 'y': self._database.bmi(stroke, distance, gender)
             }
 
+        (figure, axes) = self._axes(filename)
+
         '''
         Create plot object in memory.
 
@@ -942,30 +1150,21 @@ class Graph(object):
         for gender in genders:
             x_values = data[gender]['x']
             y_values = data[gender]['y']
-            plt.scatter(
-                x_values, y_values,
-                marker='o',
-                facecolors=self._colors_gender[gender],
-                alpha=0.5,
-                label=self._title_gender[gender].replace('\'s', ''))
+            self._scatter(axes, x_values, y_values, gender)
 
         # Create plot title
-        plt.suptitle(title)
-        plt.title('BMI vs. Square Root Speed', fontsize='smaller')
+        figure.suptitle(title)
+        axes.set_title('BMI vs. Square Root Speed', fontsize='smaller')
 
         # Create plot legend based on plot label
-        plt.legend()
+        axes.legend()
 
         # Create Axes labels
-        plt.xlabel('Square Root Speed (m/s)')
-        plt.ylabel('BMI')
+        axes.set_xlabel('Square Root Speed (m/s)')
+        axes.set_ylabel('BMI')
 
         # Display plot
-        if filename is None:
-            plt.show()
-        else:
-            plt.savefig(filename)
-        plt.close()
+        self._show(figure, filename)
 
     def bmi_sq_speed(self, _stroke, distance, gender=None, filename=None):
         """Plot BMI vs Speed Squared for a given event and gender.
@@ -1016,6 +1215,8 @@ class Graph(object):
             log.log2warning(1007, log_message)
             return
 
+        (figure, axes) = self._axes(filename)
+
         '''
         Create plot object in memory.
 
@@ -1025,30 +1226,21 @@ class Graph(object):
          edgecolors:
             The string ‘none’ to plot faces with no outlines
         '''
-        plt.scatter(
-            x_values, y_values,
-            marker='o',
-            facecolors=self._colors_gender[_gender],
-            alpha=0.5,
-            label=self._title_gender[_gender].replace('\'s', ''))
+        self._scatter(axes, x_values, y_values, _gender)
 
         # Create plot title
-        plt.suptitle(title)
-        plt.title('BMI vs. Speed Squared', fontsize='smaller')
+        figure.suptitle(title)
+        axes.set_title('BMI vs. Speed Squared', fontsize='smaller')
 
         # Create plot legend based on plot label
-        plt.legend()
+        axes.legend()
 
         # Create Axes labels
-        plt.xlabel('Speed Squared (mm/ss')
-        plt.ylabel('BMI')
+        axes.set_xlabel('Speed Squared (mm/ss')
+        axes.set_ylabel('BMI')
 
         # Display plot
-        if filename is None:
-            plt.show()
-        else:
-            plt.savefig(filename)
-        plt.close()
+        self._show(figure, filename)
 
     def _bmi_sq_speed_2(self, _stroke, distance, filename=None):
         """Plot BMI vs Speed Squared for a given event and gender.
@@ -1075,6 +1267,8 @@ class Graph(object):
                 'y': self._database.bmi(stroke, distance, gender)
             }
 
+        (figure, axes) = self._axes(filename)
+
         '''
         Create plot object in memory.
 
@@ -1087,67 +1281,79 @@ class Graph(object):
         for gender in genders:
             x_values = data[gender]['x']
             y_values = data[gender]['y']
-            plt.scatter(
-                x_values, y_values,
-                marker='o',
-                facecolors=self._colors_gender[gender],
-                alpha=0.5,
-                label=self._title_gender[gender].replace('\'s', ''))
+            self._scatter(axes, x_values, y_values, gender)
 
         # Create plot title
-        plt.suptitle(title)
-        plt.title('BMI vs. Speed Squared', fontsize='smaller')
+        figure.suptitle(title)
+        axes.set_title('BMI vs. Speed Squared', fontsize='smaller')
 
         # Create plot legend based on plot label
-        plt.legend()
+        axes.legend()
 
         # Create Axes labels
-        plt.xlabel('Speed Squared (mm/ss')
-        plt.ylabel('BMI')
+        axes.set_xlabel('Speed Squared (mm/ss')
+        axes.set_ylabel('BMI')
 
         # Display plot
-        if filename is None:
-            plt.show()
-        else:
-            plt.savefig(filename)
-        plt.close()
+        self._show(figure, filename)
 
 
-def _process_row(row, fastest=True):
-    """Process the database row.
+def _sample(count, size, seed=0):
+    """Select a random sample of indexes.
 
     Args:
-        row: Database row
+        count: Number of values to sample from
+        size: Number of indexes to select
+        seed: Seed of the random number generator. The same indexes are
+            selected every time for the same seed
 
     Returns:
-        data: tuple of important row data
+        result: Sorted array of indexes
 
     """
-    firstname = row[9]
-    lastname = row[10]
-    # birthyear = int(float(row[11]))
-    gender = row[8]
-    stroke = row[6]
-    # distance = str(int(float(row[5])))
-    distance = str(float(row[5])).replace('.0', '')
-    _time = float(row[-1])
-    _data = {
-        'bmi': float(row[14]),
-        'speed_per_kg': float(row[15]),
-        'speed': float(row[16])}
+    # Select without replacement
+    generator = np.random.default_rng(seed)
+    result = np.sort(generator.choice(
+        count, size=min(size, count), replace=False))
+    return result
 
-    if fastest is True:
-        event = ''
-    else:
-        event = '{}{}{}{}{}'.format(
-            row[0], row[1], row[2], row[3], int(float(row[4])))
 
-    superkey = hashlib.sha256(
-        bytes('{}{}{}{}{}'.format(
-            firstname, lastname, stroke, distance, event),
-        'utf-8')).hexdigest()
-    data = (
-        firstname, lastname, gender, stroke,
-        distance, _time, _data, superkey)
+def _keys(results, fastest=True):
+    """Create the keys used to group the results of each athlete.
+
+    Args:
+        results: Table object
+        fastest: Group all the results of an athlete in an event if True.
+            Otherwise group them by meet too
+
+    Returns:
+        data: Tuple of (list of key tuples, list of distances as text)
+
+    """
+    # Initialize key variables
+    firstnames = results.column('firstname').values()
+    lastnames = results.column('lastname').values()
+    strokes = results.column('stroke').values()
+    text = {}
+
+    # Format each distance only once
+    distances = []
+    for value in results.column('distance').tolist():
+        if value not in text:
+            text[value] = str(float(value)).replace('.0', '')
+        distances.append(text[value])
 
+    if fastest is True:
+        events = [''] * len(results)
+    else:
+        events = [
+            '{}{}{}{}{}'.format(*values) for values in zip(
+                results.column('meet').values(),
+                results.column('city').values(),
+                results.column('nation').values(),
+                results.column('course').values(),
+                results.column('event_id').tolist())]
+
+    keys = list(zip(firstnames, lastnames, strokes, distances, events))
+    data = (keys, distances)
     return data
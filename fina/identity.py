@@ -0,0 +1,392 @@
+"""Module to identify athletes with integer ids and match their names."""
+
+# Standard imports
+import hashlib
+import re
+import unicodedata
+
+# pip3 imports
+import numpy as np
+
+# Soundex digits of letters. Vowels and H, W, Y have none
+_SOUNDEX = dict(
+    [(letter, '1') for letter in 'BFPV'] +
+    [(letter, '2') for letter in 'CGJKQSXZ'] +
+    [(letter, '3') for letter in 'DT'] +
+    [('L', '4')] +
+    [(letter, '5') for letter in 'MN'] +
+    [('R', '6')])
+
+
+class Interner(object):
+    """Assign dense integer ids to keys in order of first use."""
+
+    def __init__(self):
+        """Method to instantiate the class.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._ids = {}
+        self._keys = []
+
+    def intern(self, key):
+        """Get the id of a key, assigning a new id to new keys.
+
+        Args:
+            key: Hashable key, such as a tuple of firstname and lastname
+
+        Returns:
+            result: Integer id
+
+        """
+        # Return existing ids
+        result = self._ids.get(key)
+        if result is None:
+            result = len(self._keys)
+            self._ids[key] = result
+            self._keys.append(key)
+        return result
+
+    def intern_all(self, keys):
+        """Get the ids of a list of keys.
+
+        Args:
+            keys: List of hashable keys
+
+        Returns:
+            result: Array of integer ids
+
+        """
+        # Return
+        keys = list(keys)
+        result = np.fromiter(
+            map(self.intern, keys), dtype=np.int64, count=len(keys))
+        return result
+
+    def key(self, _id):
+        """Get the key of an id.
+
+        Args:
+            _id: Integer id
+
+        Returns:
+            result: Key
+
+        """
+        # Return
+        result = self._keys[_id]
+        return result
+
+    def __len__(self):
+        """Get the number of ids.
+
+        Args:
+            None
+
+        Returns:
+            result: Number of ids
+
+        """
+        # Return
+        result = len(self._keys)
+        return result
+
+
+class Resolver(object):
+    """Match athletes to profiles with similar names.
+
+    Profiles are put in blocks by birth date, by birth year and by the
+    Soundex codes of their lastname and of the first word of their
+    firstname. Only the profiles in the blocks of an athlete are compared
+    with it, so athletes with a birth date only match profiles with the
+    same birth date. Athletes with only a birth year, such as those in
+    Olympic results, match profiles born that year at a lower confidence.
+    Athletes without either are compared by name alone with profiles of any
+    birth date at a lower confidence still.
+
+    """
+
+    def __init__(self, profiles, threshold=0.9):
+        """Method to instantiate the class.
+
+        Args:
+            profiles: Dict of profiles keyed by lastname, firstname,
+                birthdate
+            threshold: Minimum confidence of matches used by values
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self.threshold = threshold
+        self._profiles = profiles
+        self._keys = []
+        self._names = []
+        self._blocks = {}
+
+        # Index the normalized names of each profile
+        for lastname in sorted(profiles.keys()):
+            for firstname in sorted(profiles[lastname].keys()):
+                for birthdate in sorted(profiles[lastname][firstname].keys()):
+                    index = len(self._keys)
+                    names = _names(firstname, lastname)
+                    self._keys.append((lastname, firstname, birthdate))
+                    self._names.append(names)
+                    for value in dict.fromkeys(
+                            [None, year(birthdate), birthdate]):
+                        for key in _blocks(names, value):
+                            self._blocks.setdefault(key, []).append(index)
+
+    def match(self, firstname, lastname, birthdate=None):
+        """Find the profile of an athlete.
+
+        Args:
+            firstname: Athlete first name
+            lastname: Athlete last name
+            birthdate: Athlete birth date or birth year. Profiles with any
+                birth date are compared by name alone if None
+
+        Returns:
+            result: Tuple of ((lastname, firstname, birthdate) of the
+                profile, confidence from 0 to 1). None if no profile has a
+                similar name and the same birth date or year
+
+        """
+        # Exact matches are certain
+        birthdates = self._profiles.get(lastname, {}).get(firstname, {})
+        if birthdate in birthdates:
+            result = ((lastname, firstname, birthdate), 1.0)
+            return result
+
+        # Compare the profiles in the same blocks
+        names = _names(firstname, lastname)
+        candidates = set()
+        for key in _blocks(names, birthdate):
+            candidates.update(self._blocks.get(key, []))
+
+        # Birth years and names alone are less certain
+        if birthdate is None:
+            factor = 0.9
+        elif birthdate == year(birthdate):
+            factor = 0.95
+        else:
+            factor = 1
+        result = None
+        for index in sorted(candidates):
+            confidence = _similarity(names, self._names[index]) * factor
+            if result is None or confidence > result[1]:
+                result = (self._keys[index], confidence)
+        return result
+
+    def values(self, firstname, lastname, birthdate=None):
+        """Get the height and weight of the matching profile of an athlete.
+
+        Args:
+            firstname: Athlete first name
+            lastname: Athlete last name
+            birthdate: Athlete birth date or birth year
+
+        Returns:
+            data: Tuple of (height, weight). None if there is no match with
+                at least the threshold confidence
+
+        """
+        # Initialize key variables
+        data = None
+
+        # Get data
+        found = self.match(firstname, lastname, birthdate=birthdate)
+        if found is not None and found[1] >= self.threshold:
+            ((_lastname, _firstname, _birthdate), _) = found
+            values = self._profiles[_lastname][_firstname][_birthdate]
+            data = (values['height'], values['weight'])
+        return data
+
+
+def normalize(name):
+    """Normalize a name for comparison.
+
+    Args:
+        name: Name
+
+    Returns:
+        result: Upper case name without accents or punctuation and with
+            single spaces between words
+
+    """
+    # Remove accents
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join([
+        character for character in text
+        if unicodedata.combining(character) == 0])
+
+    # Keep letters only
+    result = ' '.join(re.sub('[^A-Z]', ' ', text.upper()).split())
+    return result
+
+
+def soundex(name):
+    """Create the Soundex code of a name.
+
+    Args:
+        name: Normalized name
+
+    Returns:
+        result: Soundex code. Blank for names without letters
+
+    """
+    # Initialize key variables
+    letters = name.replace(' ', '')
+    if bool(letters) is False:
+        return ''
+    result = letters[0]
+    previous = _SOUNDEX.get(letters[0], '')
+
+    # Letters with the same digit as the previous letter are skipped,
+    # unless they are separated by a vowel
+    for letter in letters[1:]:
+        digit = _SOUNDEX.get(letter, '')
+        if bool(digit) is True and digit != previous:
+            result = result + digit
+        if letter not in 'HW':
+            previous = digit
+
+    result = (result + '000')[:4]
+    return result
+
+
+def year(birthdate):
+    """Get the birth year of a birth date.
+
+    Args:
+        birthdate: Birth date or birth year
+
+    Returns:
+        result: Four digit birth year. None if it is not known
+
+    """
+    # Dates start with the year
+    text = '' if birthdate is None else str(birthdate)[:4]
+    if len(text) == 4 and text.isdigit() is True:
+        result = text
+    else:
+        result = None
+    return result
+
+
+def anonymize(key):
+    """Create an anonymous identifier for a key.
+
+    Args:
+        key: Tuple of values identifying an athlete
+
+    Returns:
+        result: SHA-256 hex digest of the values joined together
+
+    """
+    # Return
+    text = ''.join([str(value) for value in key])
+    result = hashlib.sha256(bytes(text, 'utf-8')).hexdigest()
+    return result
+
+
+def _names(firstname, lastname):
+    """Prepare the names of an athlete for comparison.
+
+    Args:
+        firstname: Athlete first name
+        lastname: Athlete last name
+
+    Returns:
+        result: Tuple of (normalized firstname, normalized lastname)
+
+    """
+    # Return
+    result = (normalize(firstname), normalize(lastname))
+    return result
+
+
+def _blocks(names, birthdate):
+    """Get the keys of the blocks of an athlete.
+
+    Args:
+        names: Tuple of (normalized firstname, normalized lastname)
+        birthdate: Birth date or birth year. None if unknown
+
+    Returns:
+        data: List of block keys. Blocks with the birth date None have
+            athletes of any birth date
+
+    """
+    # Initialize key variables
+    (firstname, lastname) = names
+    codes = [
+        ('L', soundex(lastname)),
+        ('F', soundex((firstname.split() or [''])[0]))]
+
+    # Return
+    data = [(birthdate,) + code for code in codes]
+    return data
+
+
+def _similarity(first, second):
+    """Compare the names of two athletes.
+
+    Args:
+        first: Tuple of (normalized firstname, normalized lastname)
+        second: Tuple of (normalized firstname, normalized lastname)
+
+    Returns:
+        result: Similarity from 0 to 1. Lastnames count more than firstnames
+
+    """
+    # Compare each name
+    values = []
+    for (one, two) in zip(first, second):
+        if one == two:
+            values.append(1.0)
+            continue
+
+        # Names with extra words, such as middle names, are similar
+        words = (set(one.split()), set(two.split()))
+        if bool(words[0]) is True and bool(words[1]) is True and (
+                words[0] <= words[1] or words[1] <= words[0]):
+            values.append(0.95)
+            continue
+
+        values.append(_dice(one, two))
+
+    result = 0.4 * values[0] + 0.6 * values[1]
+    return result
+
+
+def _dice(first, second):
+    """Calculate the Dice coefficient of the letter pairs of two names.
+
+    Args:
+        first: Normalized name
+        second: Normalized name
+
+    Returns:
+        result: Coefficient from 0 to 1
+
+    """
+    # Get the pairs of letters of each name
+    pairs = []
+    for name in [first, second]:
+        text = ' {} '.format(name)
+        pairs.append(set([
+            text[index:index + 2] for index in range(len(text) - 1)]))
+
+    total = len(pairs[0]) + len(pairs[1])
+    if bool(total) is False:
+        return 0.0
+    result = 2 * len(pairs[0] & pairs[1]) / total
+    return result
@@ -0,0 +1,472 @@
+"""Module to track the files used to create profiles, databases and charts."""
+
+# Standard imports
+import os
+import json
+import hashlib
+
+
+class _Sources(object):
+    """Source files recorded with their size, modification time and hash."""
+
+    def __init__(self, filename):
+        """Method to instantiate the class.
+
+        Args:
+            filename: Name of manifest file
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._filename = filename
+        self._sources = {}
+        self._hashes = {}
+
+    def exists(self):
+        """Determine whether the manifest file exists.
+
+        Args:
+            None
+
+        Returns:
+            result: True if the file exists
+
+        """
+        # Return
+        result = os.path.isfile(self._filename)
+        return result
+
+    def sources(self):
+        """Get the source files recorded in the manifest.
+
+        Args:
+            None
+
+        Returns:
+            data: List of filenames
+
+        """
+        # Return
+        data = sorted(self._sources.keys())
+        return data
+
+    def changed(self, filename):
+        """Determine whether a source file is new or has changed.
+
+        Args:
+            filename: Name of source file
+
+        Returns:
+            result: True if the file is new or has changed
+
+        """
+        # New files have changed
+        if filename not in self._sources:
+            return True
+        source = self._sources[filename]
+
+        # Don't hash files whose size and modification time are unchanged
+        status = os.stat(filename)
+        if status.st_size == source['size']:
+            if status.st_mtime == source['mtime']:
+                return False
+
+        result = self._hash(filename) != source['hash']
+        return result
+
+    def remove(self, filename):
+        """Remove a source file from the manifest.
+
+        Args:
+            filename: Name of source file
+
+        Returns:
+            None
+
+        """
+        # Remove
+        self._sources.pop(filename, None)
+
+    def _read(self):
+        """Read the manifest file.
+
+        Args:
+            None
+
+        Returns:
+            data: Contents of the file
+
+        """
+        # Read
+        with open(self._filename, 'r') as reader:
+            data = json.load(reader)
+        return data
+
+    def _write(self, data):
+        """Write the manifest file.
+
+        Args:
+            data: Contents of the file
+
+        Returns:
+            None
+
+        """
+        # Write to a temporary file first so the manifest is never partial
+        tmp_filename = '{}.tmp'.format(self._filename)
+        with open(tmp_filename, 'w') as writer:
+            json.dump(data, writer, sort_keys=True)
+        os.replace(tmp_filename, self._filename)
+
+    def _status(self, filename):
+        """Get the values recorded for a source file.
+
+        Args:
+            filename: Name of source file
+
+        Returns:
+            data: Dict of size, modification time and hash
+
+        """
+        # Return
+        status = os.stat(filename)
+        data = {
+            'size': status.st_size,
+            'mtime': status.st_mtime,
+            'hash': self._hash(filename)}
+        return data
+
+    def _hash(self, filename):
+        """Get the SHA-256 of a file's contents.
+
+        Args:
+            filename: Name of file
+
+        Returns:
+            result: Hex digest
+
+        """
+        # Hash each file only once
+        if filename not in self._hashes:
+            hasher = hashlib.sha256()
+            with open(filename, 'rb') as reader:
+                for chunk in iter(lambda: reader.read(1048576), b''):
+                    hasher.update(chunk)
+            self._hashes[filename] = hasher.hexdigest()
+        result = self._hashes[filename]
+        return result
+
+
+class Manifest(_Sources):
+    """Source files and the database rows created from them.
+
+    Each source file is recorded with its size, modification time and the
+    SHA-256 of its contents together with the range of database rows it
+    created. A digest of the profiles for each athlete lastname is also
+    kept so that changed profiles can be found. The database file and the
+    match confidence used to create it are recorded so that rows are only
+    reused from the database the manifest describes.
+
+    """
+
+    def __init__(self, filename):
+        """Method to instantiate the class.
+
+        Args:
+            filename: Name of manifest file
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        _Sources.__init__(self, filename)
+        self._profiles = {}
+        self._database = None
+        self._match = None
+
+        # Read the file
+        if self.exists() is True:
+            data = self._read()
+            self._sources = data['sources']
+            self._profiles = data['profiles']
+            self._database = data.get('database')
+            self._match = data.get('match')
+
+    def reusable(self, database_file, match):
+        """Determine whether rows can be reused from a database file.
+
+        Args:
+            database_file: Name of database file
+            match: Minimum confidence of inexact profile matches. None if
+                only exact matches are used
+
+        Returns:
+            result: True if the database file is the one created with the
+                manifest using the same match confidence
+
+        """
+        # The database must exist and be created with the same options
+        if self.exists() is False or self._database is None:
+            return False
+        if os.path.isfile(database_file) is False or match != self._match:
+            return False
+
+        # Don't hash files of a different size
+        if os.stat(database_file).st_size != self._database['size']:
+            return False
+        result = self._hash(database_file) == self._database['hash']
+        return result
+
+    def rows(self, filename):
+        """Get the range of database rows created by a source file.
+
+        Args:
+            filename: Name of source file
+
+        Returns:
+            result: Tuple of (start, stop)
+
+        """
+        # Return
+        source = self._sources[filename]
+        result = (source['start'], source['stop'])
+        return result
+
+    def update(self, filename, start, stop):
+        """Record a source file and the database rows it created.
+
+        Args:
+            filename: Name of source file
+            start: Index of the first row created
+            stop: Index after the last row created
+
+        Returns:
+            None
+
+        """
+        # Update
+        self._sources[filename] = self._status(filename)
+        self._sources[filename].update({'start': start, 'stop': stop})
+
+    def changed_lastnames(self, profiles):
+        """Get the lastnames of athletes whose profiles have changed.
+
+        Args:
+            profiles: Dict of profiles keyed by lastname, firstname,
+                birthdate
+
+        Returns:
+            result: Set of lastnames
+
+        """
+        # Compare digests
+        digests = _profile_digests(profiles)
+        result = set()
+        for lastname in set(digests.keys()) | set(self._profiles.keys()):
+            if digests.get(lastname) != self._profiles.get(lastname):
+                result.add(lastname)
+        return result
+
+    def save(self, profiles, database_file, match):
+        """Write the manifest file.
+
+        Args:
+            profiles: Dict of profiles keyed by lastname, firstname,
+                birthdate
+            database_file: Name of the database file created
+            match: Minimum confidence of inexact profile matches. None if
+                only exact matches are used
+
+        Returns:
+            None
+
+        """
+        # The database file has been written since it was last hashed
+        self._hashes.pop(database_file, None)
+
+        # Write
+        self._write({
+            'sources': self._sources,
+            'profiles': _profile_digests(profiles),
+            'database': self._status(database_file),
+            'match': match})
+
+
+class Profiles(_Sources):
+    """Profile source files and the athlete profiles extracted from them.
+
+    Sources recorded by a different version of the extraction code are
+    ignored, so that all files are processed again.
+
+    """
+
+    def __init__(self, filename, version):
+        """Method to instantiate the class.
+
+        Args:
+            filename: Name of manifest file
+            version: Version of the code extracting profiles
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        _Sources.__init__(self, filename)
+        self._version = version
+
+        # Read the file
+        if self.exists() is True:
+            data = self._read()
+            if data['version'] == version:
+                self._sources = data['sources']
+
+    def profiles(self, filename):
+        """Get the profiles extracted from a source file.
+
+        Args:
+            filename: Name of source file
+
+        Returns:
+            data: List of profile dicts
+
+        """
+        # Return
+        data = self._sources[filename]['profiles']
+        return data
+
+    def update(self, filename, profiles):
+        """Record a source file and the profiles extracted from it.
+
+        Args:
+            filename: Name of source file
+            profiles: List of profile dicts
+
+        Returns:
+            None
+
+        """
+        # Update
+        self._sources[filename] = self._status(filename)
+        self._sources[filename]['profiles'] = profiles
+
+    def save(self):
+        """Write the manifest file.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Write
+        self._write({'version': self._version, 'sources': self._sources})
+
+
+class Charts(object):
+    """Chart files and digests of the data used to draw them.
+
+    Charts are recorded by filename relative to the directory of the
+    manifest file.
+
+    """
+
+    def __init__(self, filename):
+        """Method to instantiate the class.
+
+        Args:
+            filename: Name of manifest file
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._filename = filename
+        self._directory = os.path.dirname(filename)
+        self._charts = {}
+
+        # Read the file
+        if os.path.isfile(filename) is True:
+            with open(filename, 'r') as reader:
+                self._charts = json.load(reader)
+
+    def changed(self, filename, digest):
+        """Determine whether a chart needs to be drawn.
+
+        Args:
+            filename: Name of chart file
+            digest: Digest of the data used to draw the chart
+
+        Returns:
+            result: True if the data has changed or the file was removed
+
+        """
+        # Charts of new or changed data need to be drawn
+        key = os.path.relpath(filename, self._directory)
+        chart = self._charts.get(key)
+        if chart is None or chart['digest'] != digest:
+            return True
+
+        # No file is created for charts without data. Other charts that
+        # were removed need to be drawn again
+        result = chart['exists'] is True and os.path.isfile(
+            filename) is False
+        return result
+
+    def update(self, filename, digest):
+        """Record the digest of the data used to draw a chart.
+
+        Args:
+            filename: Name of chart file after it was drawn
+            digest: Digest of the data used to draw the chart
+
+        Returns:
+            None
+
+        """
+        # Update
+        key = os.path.relpath(filename, self._directory)
+        self._charts[key] = {
+            'digest': digest,
+            'exists': os.path.isfile(filename)}
+
+    def save(self):
+        """Write the manifest file.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Write to a temporary file first so the manifest is never partial
+        tmp_filename = '{}.tmp'.format(self._filename)
+        with open(tmp_filename, 'w') as writer:
+            json.dump(self._charts, writer, sort_keys=True, indent=1)
+        os.replace(tmp_filename, self._filename)
+
+
+def _profile_digests(profiles):
+    """Create a digest of the profiles for each lastname.
+
+    Args:
+        profiles: Dict of profiles keyed by lastname, firstname, birthdate
+
+    Returns:
+        data: Dict of digests keyed by lastname
+
+    """
+    # Initialize key variables
+    data = {}
+
+    for lastname, values in profiles.items():
+        text = json.dumps(values, sort_keys=True)
+        data[lastname] = hashlib.sha256(
+            bytes(text, 'utf-8')).hexdigest()[:16]
+    return data
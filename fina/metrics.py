@@ -0,0 +1,124 @@
+"""Module to calculate measurements derived from swimmer results.
+
+All functions operate on NumPy arrays so that the measurements of every
+result in a table are calculated at once.
+
+"""
+
+# pip3 imports
+import numpy as np
+
+# Number of decimal places of derived measurements in the database
+DECIMALS = 6
+
+# Metres per yard
+YARD = 0.9144
+
+
+def factor(course):
+    """Get the factors to convert distances of courses to metres.
+
+    Args:
+        course: Array of courses (LCM, SCM, SCY)
+
+    Returns:
+        result: Array of conversion factors
+
+    """
+    # Yard courses need conversion
+    yards = np.char.endswith(
+        np.char.upper(np.asarray(course, dtype=str)), 'Y')
+    result = np.where(yards, YARD, 1.0)
+    return result
+
+
+def bmi(height, weight):
+    """Calculate the body mass index.
+
+    Args:
+        height: Array of heights in cm
+        weight: Array of weights in kg
+
+    Returns:
+        result: Array of BMIs
+
+    """
+    # Calculate
+    height = np.asarray(height, dtype=np.float64)
+    weight = np.asarray(weight, dtype=np.float64)
+    result = weight / ((height / 100) * (height / 100))
+    return result
+
+
+def speed(distance, time):
+    """Calculate the average speed.
+
+    Args:
+        distance: Array of distances in metres
+        time: Array of times in seconds
+
+    Returns:
+        result: Array of speeds in m/s
+
+    """
+    # Calculate
+    distance = np.asarray(distance, dtype=np.float64)
+    time = np.asarray(time, dtype=np.float64)
+    result = distance / time
+    return result
+
+
+def speed_per_kg(_speed, weight):
+    """Calculate the average speed per kg of weight.
+
+    Args:
+        _speed: Array of speeds in m/s
+        weight: Array of weights in kg
+
+    Returns:
+        result: Array of speeds per kg
+
+    """
+    # Calculate
+    _speed = np.asarray(_speed, dtype=np.float64)
+    weight = np.asarray(weight, dtype=np.float64)
+    result = _speed / weight
+    return result
+
+
+def derive(distance, time, height, weight):
+    """Calculate all measurements derived from results.
+
+    Args:
+        distance: Array of distances in metres
+        time: Array of times in seconds
+        height: Array of heights in cm
+        weight: Array of weights in kg
+
+    Returns:
+        data: Dict of arrays keyed by measurement name (bmi, speed,
+            speed_per_kg). Values are not rounded
+
+    """
+    # Calculate
+    _speed = speed(distance, time)
+    data = {
+        'bmi': bmi(height, weight),
+        'speed': _speed,
+        'speed_per_kg': speed_per_kg(_speed, weight)}
+    return data
+
+
+def rounded(values):
+    """Round measurements to the precision used in the database.
+
+    Args:
+        values: Array of measurements
+
+    Returns:
+        result: Array of rounded measurements
+
+    """
+    # Round
+    result = np.round(values, DECIMALS)
+    return result
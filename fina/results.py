@@ -5,12 +5,29 @@ import xml.etree.ElementTree as ET
 import operator
 import xlrd
 import re
+import numpy as np
 import sys
+from collections import defaultdict
 from pprint import pprint
 
 # Fina imports
 from fina import log
 from fina import general
+from fina import identity
+from fina import metrics
+
+# Version of the rows created by the *_raw methods. Increment this when they
+# change so that cached results are no longer used
+RAW_VERSION = 2
+
+# Value of height, weight and derived measurements if there is no profile
+_NA = float('nan')
+
+# Number of results StreamLenex adds profile data to at once
+_BATCH_SIZE = 1024
+
+# Regular expression for LENEX swimtimes (HH:MM:SS.ss)
+_SWIMTIME = re.compile(r'^\d{2}:\d{2}:[0-9\.]+$')
 
 
 class FileOlympics2016(object):
@@ -175,77 +192,50 @@ class FileOlympics2016(object):
         # Initialize key variables
         pass
 
-    def results_csv(self):
-        """Get results for an event.
+    def results_raw(self):
+        """Get results without athlete profile data.
 
         Args:
             None
 
         Returns:
-            data: List of dicts with information
+            data: List of lists with information
 
         """
         # Initialize key variables
         data = []
-        factor = 6
 
         # Get data for participants
         for participant in self._results:
-            firstname = participant['firstname']
-            lastname = participant['lastname']
-            gender = participant['gender']
-            birthyear = participant['birthyear']
-            swimtime = participant['time']
-            stroke = participant['stroke']
-            distance = participant['distance']
-            city = participant['city']
-            nation = participant['nation']
-            meet = participant['meet']
-            course = participant['course']
-            event_id = participant['event_id']
-            _round = participant['round']
-
             # Don't process people with zero times
-            if bool(swimtime) is False:
+            if participant['time'] is None or participant['time'] <= 0:
                 continue
 
-            # Get height and weight data
-            values = self._height_weight(firstname, lastname)
-            if bool(values) is False:
-                if self._with_na is True:
-                    bmi = 'N/A'
-                    speed = 'N/A'
-                    speed_per_kg = 'N/A'
-                    weight = 'N/A'
-                    height = 'N/A'
-                else:
-                    continue
-            else:
-                (height, weight) = values
+            output = [
+                participant['meet'], participant['city'],
+                participant['nation'], participant['course'],
+                participant['event_id'], participant['distance'],
+                participant['stroke'], participant['round'],
+                participant['gender'], participant['firstname'],
+                participant['lastname'], participant['birthyear'],
+                participant['time']]
+            data.append(output)
 
-                _bmi = weight / ((height / 100) * (height / 100))
-                bmi = str(round(_bmi, factor))
+        return data
 
-                _speed = float(distance) / float(swimtime)
-                speed = str(round(_speed, factor))
+    def results_csv(self):
+        """Get results for an event.
 
-                _speed_per_kg = _speed / weight
-                speed_per_kg = str(round(_speed_per_kg, factor))
+        Args:
+            None
 
-            # Create list for output ignoring None values it may contain
-            output = [
-                meet, city, nation, course,
-                event_id, distance, stroke, _round,
-                gender, firstname, lastname, birthyear,
-                str(height), str(weight),
-                bmi,
-                speed_per_kg,
-                speed,
-                swimtime]
-            if None in output:
-                continue
-            data.append(output)
+        Returns:
+            data: List of dicts with information
 
+        """
+        # Get data for participants
+        data = olympics_csv(
+            self.results_raw(), self._profiles, with_na=self._with_na)
         return data
 
     def allresults(self, stage=None):
@@ -280,34 +270,6 @@ class FileOlympics2016(object):
         data = results_csv_sorter(_data)
         return data
 
-    def _height_weight(self, firstname, lastname):
-        """Get weight and height of athlete.
-
-        Args:
-            firstname: Athlete first name
-            lastname: Athlete last name
-
-        Returns:
-            data: tuple of (height, weight)
-
-        """
-        # Initialize key variables
-        data = None
-        profiles = self._profiles
-
-        # Get data
-        if lastname in profiles:
-            if firstname in profiles[lastname]:
-                # Just get the first match
-                for birthdate in sorted(profiles[lastname][firstname].keys()):
-                    values = profiles[lastname][firstname][birthdate]
-                    height = values['height']
-                    weight = values['weight']
-                    data = (height, weight)
-                    break
-
-        return data
-
 
 class FileLenex(object):
     """Process XML data from http://www.omegatiming.com."""
@@ -331,16 +293,95 @@ class FileLenex(object):
 
         # Verify the file version is correct
         for node in self._root.iter('LENEX'):
-            if 'version' not in node.attrib:
-                log_message = (
-                    'This file {} is not supported.'.format(filename))
-                log.log2die(1000, log_message)
-            else:
-                if node.attrib['version'] not in ['3.0', '2.0']:
-                    log_message = (
-                        'This version of file {} is not supported.'
-                        ''.format(filename))
-                    log.log2die(1001, log_message)
+            _lenex_version(node, filename)
+
+        # Walk the tree once to create lookup tables
+        self._tree = None
+        self._refresh()
+
+    def _refresh(self):
+        """Recreate the lookup tables if the tree has been replaced.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        if self._tree is not self._root:
+            self._index()
+
+    def _index(self):
+        """Create meet, event, club, athlete, entry and result lookup tables.
+
+        The tree is walked only once. All other methods use these tables
+        instead of searching the tree again.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._tree = self._root
+        self._meet = []
+        self._sessions = []
+        self._events = []
+        self._event_map = {}
+        self._clubs = []
+        self._athletes = []
+        self._athlete_map = {}
+        self._entry_map = defaultdict(list)
+        self._result_map = defaultdict(list)
+
+        # Get meet information. Only the first meet is used
+        meets = self._root.findall('./MEETS/MEET')
+        for meet in meets:
+            self._meet = [meet.attrib]
+            break
+        self._course = self._meet[0]['course']
+        self._factor = _distance_factor(self._course)
+
+        for meet in meets:
+            # Get event data
+            for session in meet.findall('./SESSIONS/SESSION'):
+                self._sessions.append(session.attrib)
+                session_id = session.attrib['number']
+                for event in session.findall('./EVENTS/EVENT'):
+                    item = _event(event, session_id, self._factor)
+                    self._events.append(item)
+                    self._event_map[int(item['eventid'])] = item
+
+            # Get club data
+            for club in meet.findall('./CLUBS/CLUB'):
+                self._clubs.append(club.attrib)
+
+                # Skip officials who are not part of a club
+                if 'code' not in club.attrib:
+                    continue
+
+                # Get the club ID for identifying athletes
+                club_id = club.attrib['code']
+
+                # Get athlete data
+                for athlete in club.findall('./ATHLETES/ATHLETE'):
+                    item = _athlete(athlete, club_id)
+                    vitals = item['vitals']
+                    self._athletes.append(item)
+                    self._athlete_map[int(vitals['athleteid'])] = item
+
+                    # Create entries and results for each event
+                    for entry in item['entries']:
+                        if 'eventid' in entry:
+                            self._entry_map[int(entry['eventid'])].append(
+                                {'vitals': vitals, 'entries': [entry]})
+                    for result in item['results']:
+                        if 'eventid' in result:
+                            self._result_map[int(result['eventid'])].append(
+                                {'vitals': vitals, 'results': [result]})
 
     def meet(self):
         """Get meet information.
@@ -353,10 +394,8 @@ class FileLenex(object):
 
         """
         # Get data
-        data = []
-        for node in self._root.findall('./MEETS/MEET'):
-            data = [node.attrib]
-            break
+        self._refresh()
+        data = list(self._meet)
         return data
 
     def metric(self):
@@ -370,12 +409,23 @@ class FileLenex(object):
 
         """
         # Get data
-        data = self.meet()[0]
-        course = data['course']
-        if course[-1].upper() == 'Y':
-            result = False
-        else:
-            result = True
+        self._refresh()
+        result = self._factor == 1
+        return result
+
+    def course(self):
+        """Get meet course.
+
+        Args:
+            None
+
+        Returns:
+            result: Course of the meet (LCM, SCM, SCY)
+
+        """
+        # Get data
+        self._refresh()
+        result = self._course
         return result
 
     def sessions(self):
@@ -389,9 +439,8 @@ class FileLenex(object):
 
         """
         # Get data
-        data = []
-        for node in self._root.findall('./MEETS/MEET/SESSIONS/SESSION'):
-            data.append(node.attrib)
+        self._refresh()
+        data = list(self._sessions)
         return data
 
     def events(self, stage=None):
@@ -406,44 +455,18 @@ class FileLenex(object):
 
         """
         # Get data
+        self._refresh()
         data = []
+        for item in self._events:
+            # Skip rounds depending on 'stage' filter
+            if stage is None:
+                pass
+            else:
+                if item['round'].upper() != stage.upper():
+                    continue
 
-        # Get sesssions
-        sessions = self.sessions()
-        for session in sessions:
-            session_id = session['number']
-
-            # Get event data
-            for event in self._root.findall(
-                    './MEETS/MEET/SESSIONS/SESSION[@number="{}"]/EVENTS/EVENT'
-                    ''.format(session_id)):
-                # Store event attributes
-                event_id = event.attrib['eventid']
-                item = {}
-                item['sessionid'] = session_id
-                for key, value in event.attrib.items():
-                    item[key] = value.strip()
-
-                # Skip rounds depending on 'stage' filter
-                if stage is None:
-                    pass
-                else:
-                    if item['round'].upper() != stage.upper():
-                        continue
-
-                # Store swimstyle attributes for the event
-                for swimstyle in self._root.findall(
-                        './MEETS/MEET/SESSIONS/SESSION/EVENTS/EVENT'
-                        '[@eventid="{}"]/SWIMSTYLE'.format(event_id)):
-                    for key, value in swimstyle.attrib.items():
-                        item[key] = value.strip()
-
-                # Modify distance to metric equivalent
-                if self.metric() is False:
-                    item['distance'] = str(float(item['distance']) * 0.9144)
-
-                # Update data
-                data.append(item)
+            # Update data
+            data.append(item)
 
         return data
 
@@ -459,10 +482,8 @@ class FileLenex(object):
 
         """
         # Get data
-        data = None
-        for event in self.events():
-            if int(event_id) == int(event['eventid']):
-                data = event
+        self._refresh()
+        data = self._event_map.get(int(event_id))
         return data
 
     def clubs(self):
@@ -476,9 +497,8 @@ class FileLenex(object):
 
         """
         # Get data
-        data = []
-        for node in self._root.findall('./MEETS/MEET/CLUBS/CLUB'):
-            data.append(node.attrib)
+        self._refresh()
+        data = list(self._clubs)
         return data
 
     def athletes(self):
@@ -492,146 +512,38 @@ class FileLenex(object):
 
         """
         # Get data
-        data = []
-
-        clubs = self.clubs()
-        for club in clubs:
-            # Skip officials who are not part of a club
-            if 'code' not in club:
-                continue
-
-            # Get the club ID for identifying athletes
-            club_id = club['code']
-
-            # Get athlete data
-            for athlete in self._root.findall(
-                    './MEETS/MEET/CLUBS/CLUB[@code="{}"]/ATHLETES/ATHLETE'
-                    ''.format(club_id)):
-                # Store athlete attributes
-                athlete_id = athlete.attrib['athleteid']
-                item = {}
-
-                # Store vitals for athtlete
-                vitals = {}
-                vitals['clubid'] = club_id
-                for key, value in athlete.attrib.items():
-                    vitals[key] = value.strip()
-                item['vitals'] = vitals
-
-                # Store entry attributes for the athlete
-                entries = self._athlete_entries(club_id, athlete_id)
-                item['entries'] = entries
-
-                # Store result attributes for the athlete
-                results = self._athlete_results(club_id, athlete_id)
-                item['results'] = results
-
-                data.append(item)
-
+        self._refresh()
+        data = list(self._athletes)
         return data
 
-    def _athlete_entries(self, club_id, athlete_id):
-        """Get all athlete information.
+    def athlete(self, athlete_id):
+        """Get athlete information.
 
         Args:
-            club_id: Club ID number
-            athlete_id: Athlete ID
+            athlete_id: Athlete ID number
 
         Returns:
-            data: List of dicts with information
+            data: dict with information. None if not found
 
         """
         # Get data
-        data = []
-
-        # Store entry attributes for the athlete
-        for entry in self._root.findall(
-                './MEETS/MEET/CLUBS/CLUB[@code="{}"]/ATHLETES/ATHLETE'
-                '[@athleteid="{}"]/ENTRIES/ENTRY'.format(club_id, athlete_id)):
-            attributes = {}
-            for key, value in entry.attrib.items():
-                attributes[key] = value.strip()
-
-            # Get MEETINFO data by additionally filtering by eventid
-            event_id = attributes['eventid']
-            for meetinfo in self._root.findall(
-                    './MEETS/MEET/CLUBS/CLUB[@code="{}"]/ATHLETES/ATHLETE'
-                    '[@athleteid="{}"]/ENTRIES/ENTRY[@eventid="{}"]/MEETINFO'
-                    ''.format(club_id, athlete_id, event_id)):
-                for key, value in meetinfo.attrib.items():
-                    attributes[key] = value.strip()
-            data.append(attributes)
-
+        self._refresh()
+        data = self._athlete_map.get(int(athlete_id))
         return data
 
-    def _athlete_results(self, club_id, athlete_id):
-        """Get all athlete information.
+    def entries(self, event_id):
+        """Get entries for an event.
 
         Args:
-            club_id: Club ID number
-            athlete_id: Athlete ID
+            event_id: Event ID number
 
         Returns:
             data: List of dicts with information
 
         """
         # Get data
-        data = []
-        regex = re.compile(r'^\d{2}:\d{2}:[0-9\.]+$')
-
-        # Store results attributes for the athlete
-        for result in self._root.findall(
-                './MEETS/MEET/CLUBS/CLUB[@code="{}"]/ATHLETES/ATHLETE'
-                '[@athleteid="{}"]/RESULTS/RESULT'
-                ''.format(club_id, athlete_id)):
-            attributes = {}
-            for key, value in result.attrib.items():
-                attributes[key] = value.strip()
-
-            # Get the swimtime in seconds
-            swimtime = attributes['swimtime']
-            valid = regex.match(swimtime)
-            if bool(valid) is True:
-                (hours, minutes, seconds) = swimtime.split(':')
-                total_seconds = (int(hours) * 3600) + (
-                    int(minutes) * 60) + float(seconds)
-                attributes['time'] = '{}'.format(total_seconds)
-            else:
-                attributes['time'] = None
-
-            # Get SPLITS data by additionally filtering by eventid
-            attributes['splits'] = []
-            event_id = attributes['eventid']
-            for split in self._root.findall(
-                    './MEETS/MEET/CLUBS/CLUB[@code="{}"]/ATHLETES/ATHLETE'
-                    '[@athleteid="{}"]/RESULTS/RESULT[@eventid="{}"]'
-                    '/SPLITS/SPLIT'
-                    ''.format(club_id, athlete_id, event_id)):
-                splits = []
-                for key, value in split.attrib.items():
-                    splits.append({key: value.strip()})
-                attributes['splits'].append(splits)
-
-            data.append(attributes)
-
-        return data
-
-    def athlete(self, athlete_id):
-        """Get athlete information.
-
-        Args:
-            athlete_id: Athlete ID number
-
-        Returns:
-            data: dict with information. None if not found
-
-        """
-        # Get data
-        data = None
-        for athlete in self.athletes():
-            if int(athlete_id) == int(athlete['vitals']['athleteid']):
-                data = athlete
-
+        self._refresh()
+        data = list(self._entry_map.get(int(event_id), []))
         return data
 
     def results(self, event_id):
@@ -644,22 +556,9 @@ class FileLenex(object):
             data: List of dicts with information
 
         """
-        # Initialize key variables
-        data = []
-
-        # Get athlete data for event
-        athletes = self.athletes()
-
-        for athlete in athletes:
-            if 'results' in athlete:
-                for event in athlete['results']:
-                    if 'eventid' in event:
-                        if int(event['eventid']) == int(event_id):
-                            result = {}
-                            result['vitals'] = athlete['vitals']
-                            result['results'] = [event]
-                            data.append(result)
-
+        # Get data
+        self._refresh()
+        data = list(self._result_map.get(int(event_id), []))
         return data
 
     def results_csv(self, _event_id):
@@ -676,75 +575,43 @@ class FileLenex(object):
         event_id = str(_event_id)
         participants = self.results(event_id)
         event = self.event(event_id)
-        meet = self.meet()
+        meet = self.meet()[0]
         data = []
-        factor = 6
-
-        # Get data for the meet
-        city = meet[0]['city']
-        nation = meet[0]['nation']
-        course = meet[0]['course']
-        meet = meet[0]['name']
 
         # Get data for participants
         for participant in participants:
-            firstname = participant['vitals']['firstname']
-            lastname = participant['vitals']['lastname']
-            gender = participant['vitals']['gender']
-            birthdate = participant['vitals']['birthdate']
-            swimtime = participant['results'][0]['time']
-            stroke = event['stroke']
-            distance = event['distance']
-            _round = event['round']
+            raw = _lenex_raw(
+                meet, event_id, event, participant['vitals'],
+                participant['results'][0]['time'])
+            if raw is not None:
+                data.append(raw)
 
-            # Don't process people with zero times
-            if bool(swimtime) is False:
-                continue
-
-            # Get height and weight data
-            values = self._height_weight(firstname, lastname, birthdate)
-            if bool(values) is False:
-                if self._with_na is True:
-                    bmi = 'N/A'
-                    speed = 'N/A'
-                    speed_per_kg = 'N/A'
-                    weight = 'N/A'
-                    height = 'N/A'
-                else:
-                    continue
-            else:
-                (height, weight) = values
-
-                _bmi = weight / ((height / 100) * (height / 100))
-                bmi = str(round(_bmi, factor))
+        data = _lenex_join(data, self._profiles, self._with_na)
+        return data
 
-                _speed = float(distance) / float(swimtime)
-                speed = str(round(_speed, factor))
+    def allresults_raw(self, stage=None):
+        """Get results for all events without athlete profile data.
 
-                _speed_per_kg = _speed / weight
-                speed_per_kg = str(round(_speed_per_kg, factor))
+        Args:
+            stage: Round of event
 
-            # We've seen errors heights cause very high BMIs.
-            if self._with_na is False:
-                if _bmi > 30:
-                    continue
+        Returns:
+            data: List of lists with information
 
-            # Get birthyear
-            birthyear = int(birthdate.split('-')[0])
+        """
+        # Initialize key variables
+        meet = self.meet()[0]
+        data = []
 
-            # Create list for output ignoring None values it may contain
-            output = [
-                meet, city, nation, course,
-                event_id, distance, stroke, _round,
-                gender, firstname, lastname, birthyear,
-                str(height), str(weight),
-                bmi,
-                speed_per_kg,
-                speed,
-                swimtime]
-            if None in output:
-                continue
-            data.append(output)
+        # Get results for each event
+        for event in self.events(stage=stage):
+            event_id = str(int(event['eventid']))
+            for participant in self.results(event_id):
+                output = _lenex_raw(
+                    meet, event_id, event, participant['vitals'],
+                    participant['results'][0]['time'])
+                if output is not None:
+                    data.append(output)
 
         return data
 
@@ -782,47 +649,229 @@ class FileLenex(object):
             data: List of lists with information
 
         """
-        # Initialize key variables
-        event_ids = []
-        _data = []
+        # Get results
+        data = lenex_csv(
+            self.allresults_raw(stage=stage), self._profiles,
+            with_na=self._with_na)
+        return data
 
-        # Get results for each event
-        for event in self.events(stage=stage):
-            event_ids.append(int(event['eventid']))
-        for event_id in sorted(event_ids):
-            result = self.results_csv(event_id)
-            _data.extend(result)
 
-        data = results_csv_sorter(_data)
-        return data
+class StreamLenex(object):
+    """Process XML data from http://www.omegatiming.com incrementally.
 
-    def _height_weight(self, firstname, lastname, birthdate):
-        """Get weight and height of athlete.
+    The file is read with iterparse. Each ATHLETE and CLUB element is
+    discarded as soon as it has been processed, so memory usage does not
+    grow with the size of the meet.
+
+    """
+
+    def __init__(self, filename, profiles, with_na=False):
+        """Method to instantiate the class.
 
         Args:
-            firstname: Athlete first name
-            lastname: Athlete last name
-            birthdate: Athlete birth date
+            filename: Name of file to process
+            profiles: dict of athlete profiles
+            with_na: Include swimmers where there are N/A values for
+                weight or height
 
         Returns:
-            data: tuple of (height, weight)
+            None
+
+        """
+        self._filename = filename
+        self._profiles = profiles
+        self._with_na = with_na
+
+    def iterresults_csv(self, stage=None):
+        """Get results for all events as they are read from the file.
+
+        Args:
+            stage: Round of event
+
+        Returns:
+            output: Generator of lists with information
 
         """
         # Initialize key variables
-        data = None
-        profiles = self._profiles
+        batch = []
 
-        # Get data
-        if lastname in profiles:
-            if firstname in profiles[lastname]:
-                if birthdate in profiles[lastname][firstname]:
-                    values = profiles[lastname][firstname][birthdate]
-                    height = values['height']
-                    weight = values['weight']
-                    data = (height, weight)
+        # Add profile data to batches of results to limit memory usage
+        for raw in self.iterresults_raw(stage=stage):
+            batch.append(raw)
+            if len(batch) == _BATCH_SIZE:
+                yield from _lenex_join(batch, self._profiles, self._with_na)
+                batch = []
+        yield from _lenex_join(batch, self._profiles, self._with_na)
+
+    def iterresults_raw(self, stage=None):
+        """Get results without athlete profile data as they are read.
+
+        Args:
+            stage: Round of event
+
+        Returns:
+            output: Generator of lists with information
+
+        """
+        # Initialize key variables
+        meet = None
+        factor = 1
+        events = {}
+        session_id = None
+        club_id = None
+        vitals = None
+        parents = []
+
+        for (action, element) in ET.iterparse(
+                self._filename, events=('start', 'end')):
+            tag = element.tag
+
+            # Attributes are available as soon as the element starts
+            if action == 'start':
+                parent = parents[-1].tag if bool(parents) else None
+                if tag == 'LENEX':
+                    _lenex_version(element, self._filename)
+                elif tag == 'MEET' and meet is None:
+                    meet = element.attrib
+                    factor = _distance_factor(meet['course'])
+                elif tag == 'SESSION' and parent == 'SESSIONS':
+                    session_id = element.attrib['number']
+                elif tag == 'CLUB' and parent == 'CLUBS':
+                    # Skip officials who are not part of a club
+                    club_id = element.attrib.get('code')
+                elif tag == 'ATHLETE' and parent == 'ATHLETES':
+                    if club_id is None:
+                        vitals = None
+                    else:
+                        vitals = {}
+                        vitals['clubid'] = club_id
+                        for key, value in element.attrib.items():
+                            vitals[key] = value.strip()
+                parents.append(element)
+                continue
 
+            # Children are available when the element ends
+            parents.pop()
+            parent = parents[-1].tag if bool(parents) else None
+            if tag == 'EVENT' and parent == 'EVENTS':
+                item = _event(element, session_id, factor)
+                events[int(item['eventid'])] = item
+
+            elif tag == 'RESULT' and parent == 'RESULTS':
+                # Skip relay results
+                if parents[-2].tag != 'ATHLETE' or vitals is None:
+                    continue
+
+                result = _result(element)
+                if 'eventid' not in result:
+                    continue
+
+                # Skip rounds depending on 'stage' filter
+                event = events.get(int(result['eventid']))
+                if event is None:
+                    continue
+                if stage is not None:
+                    if event['round'].upper() != stage.upper():
+                        continue
+
+                output = _lenex_raw(
+                    meet, str(int(result['eventid'])), event, vitals,
+                    result['time'])
+                if output is not None:
+                    yield output
+
+            elif tag in ['ATHLETE', 'CLUB'] and bool(parents) is True:
+                # Free the processed subtree
+                element.clear()
+                parents[-1].remove(element)
+
+    def allresults_csv(self, stage=None):
+        """Get results for all events.
+
+        Args:
+            stage: Round of event
+
+        Returns:
+            data: List of lists with information
+
+        """
+        # Get results
+        data = lenex_csv(
+            self.iterresults_raw(stage=stage), self._profiles,
+            with_na=self._with_na)
         return data
 
+    def allresults_raw(self, stage=None):
+        """Get results for all events without athlete profile data.
+
+        Args:
+            stage: Round of event
+
+        Returns:
+            data: List of lists with information
+
+        """
+        # Get results
+        data = list(self.iterresults_raw(stage=stage))
+        return data
+
+
+def lenex_csv(raw_data, profiles, with_na=False, resolver=None):
+    """Add athlete profile data to LENEX results.
+
+    Args:
+        raw_data: List of lists created by allresults_raw
+        profiles: dict of athlete profiles
+        with_na: Include swimmers where there are N/A values for
+            weight or height
+        resolver: identity.Resolver object used to find the profiles of
+            athletes whose names don't match exactly. Only exact matches
+            are used if None
+
+    Returns:
+        data: Sorted list of lists with information
+
+    """
+    # Get results
+    _data = _lenex_join(raw_data, profiles, with_na, resolver=resolver)
+    data = results_csv_sorter(_data)
+    return data
+
+
+def olympics_csv(raw_data, profiles, with_na=False, resolver=None):
+    """Add athlete profile data to Olympics results.
+
+    Args:
+        raw_data: List of lists created by results_raw
+        profiles: dict of athlete profiles
+        with_na: Include swimmers where there are N/A values for
+            weight or height
+        resolver: identity.Resolver object used to find the profiles of
+            athletes with similar names born in the same year, where it is
+            known. Only exact name matches of any age are used if None
+
+    Returns:
+        data: Sorted list of lists with information
+
+    """
+    # Initialize key variables
+    raw_data = list(raw_data)
+
+    # Get height and weight data. Names that match exactly are still
+    # checked against the birth year when there is a resolver
+    if resolver is None:
+        values = [
+            _olympics_height_weight(profiles, raw[9], raw[10])
+            for raw in raw_data]
+    else:
+        values = [
+            resolver.values(raw[9], raw[10], identity.year(raw[11]))
+            for raw in raw_data]
+
+    _data = _join(raw_data, values, with_na)
+    data = results_csv_sorter(_data)
+    return data
+
 
 def results_csv_sorter(_data):
     """Get results for all events.
@@ -838,3 +887,373 @@ def results_csv_sorter(_data):
     data = sorted(time_sorted, key=operator.itemgetter(
         0, 1, 2, 3, 4, 5, 6, 7, 8))
     return data
+
+
+def _event(event, session_id, factor):
+    """Get event information from an EVENT element.
+
+    Args:
+        event: EVENT element
+        session_id: Session ID number
+        factor: Factor to convert the event distance to metres
+
+    Returns:
+        item: Dict with information
+
+    """
+    # Store event attributes
+    item = {}
+    item['sessionid'] = session_id
+    for key, value in event.attrib.items():
+        item[key] = value.strip()
+
+    # Store swimstyle attributes for the event
+    for swimstyle in event.findall('./SWIMSTYLE'):
+        for key, value in swimstyle.attrib.items():
+            item[key] = value.strip()
+
+    # Modify distance to metric equivalent
+    if factor != 1:
+        item['distance'] = str(float(item['distance']) * factor)
+
+    return item
+
+
+def _distance_factor(course):
+    """Get the factor to convert distances of a course to metres.
+
+    Args:
+        course: Course of the meet (LCM, SCM, SCY)
+
+    Returns:
+        result: Conversion factor
+
+    """
+    # Return
+    result = float(metrics.factor(course))
+    return result
+
+
+def _athlete(athlete, club_id):
+    """Get athlete information from an ATHLETE element.
+
+    Args:
+        athlete: ATHLETE element
+        club_id: Club ID number
+
+    Returns:
+        item: Dict with information
+
+    """
+    # Initialize key variables
+    item = {}
+
+    # Store vitals for athtlete
+    vitals = {}
+    vitals['clubid'] = club_id
+    for key, value in athlete.attrib.items():
+        vitals[key] = value.strip()
+    item['vitals'] = vitals
+
+    # Store entry attributes for the athlete
+    item['entries'] = _athlete_entries(athlete)
+
+    # Store result attributes for the athlete
+    item['results'] = _athlete_results(athlete)
+    return item
+
+
+def _athlete_entries(athlete):
+    """Get all entry information for an ATHLETE element.
+
+    Args:
+        athlete: ATHLETE element
+
+    Returns:
+        data: List of dicts with information
+
+    """
+    # Get data
+    data = []
+
+    # Store entry attributes for the athlete
+    for entry in athlete.findall('./ENTRIES/ENTRY'):
+        attributes = {}
+        for key, value in entry.attrib.items():
+            attributes[key] = value.strip()
+
+        # Get MEETINFO data
+        for meetinfo in entry.findall('./MEETINFO'):
+            for key, value in meetinfo.attrib.items():
+                attributes[key] = value.strip()
+        data.append(attributes)
+
+    return data
+
+
+def _athlete_results(athlete):
+    """Get all result information for an ATHLETE element.
+
+    Args:
+        athlete: ATHLETE element
+
+    Returns:
+        data: List of dicts with information
+
+    """
+    # Get data
+    data = []
+
+    # Store results attributes for the athlete
+    for result in athlete.findall('./RESULTS/RESULT'):
+        data.append(_result(result))
+
+    return data
+
+
+def _result(result):
+    """Get result information from a RESULT element.
+
+    Args:
+        result: RESULT element
+
+    Returns:
+        attributes: Dict with information
+
+    """
+    # Initialize key variables
+    attributes = {}
+    for key, value in result.attrib.items():
+        attributes[key] = value.strip()
+
+    # Get the swimtime in seconds
+    swimtime = attributes['swimtime']
+    valid = _SWIMTIME.match(swimtime)
+    if bool(valid) is True:
+        (hours, minutes, seconds) = swimtime.split(':')
+        total_seconds = (int(hours) * 3600) + (
+            int(minutes) * 60) + float(seconds)
+        attributes['time'] = '{}'.format(total_seconds)
+    else:
+        attributes['time'] = None
+
+    # Get SPLITS data
+    attributes['splits'] = []
+    for split in result.findall('./SPLITS/SPLIT'):
+        splits = []
+        for key, value in split.attrib.items():
+            splits.append({key: value.strip()})
+        attributes['splits'].append(splits)
+
+    return attributes
+
+
+def _lenex_version(node, filename):
+    """Die if the version of a LENEX file is not supported.
+
+    Args:
+        node: LENEX element
+        filename: Name of file being processed
+
+    Returns:
+        None
+
+    """
+    if 'version' not in node.attrib:
+        log_message = (
+            'This file {} is not supported.'.format(filename))
+        log.log2die(1000, log_message)
+    else:
+        if node.attrib['version'] not in ['3.0', '2.0']:
+            log_message = (
+                'This version of file {} is not supported.'
+                ''.format(filename))
+            log.log2die(1001, log_message)
+
+
+def _lenex_raw(meet, event_id, event, vitals, swimtime):
+    """Create a row for an athlete's result without profile data.
+
+    Args:
+        meet: Dict of meet information
+        event_id: Event ID number
+        event: Dict of event information
+        vitals: Dict of athlete information
+        swimtime: Swim time in seconds
+
+    Returns:
+        output: List with information. None if the result is skipped
+
+    """
+    # Don't process people with zero times. LENEX times are text
+    if swimtime is None or float(swimtime) <= 0:
+        return None
+
+    output = [
+        meet['name'], meet['city'], meet['nation'], meet['course'],
+        event_id, event['distance'], event['stroke'], event['round'],
+        vitals['gender'], vitals['firstname'], vitals['lastname'],
+        vitals['birthdate'], swimtime]
+    return output
+
+
+def _lenex_join(raw_data, profiles, with_na, resolver=None):
+    """Add athlete profile data to LENEX results.
+
+    Args:
+        raw_data: List of lists of result information created by _lenex_raw
+        profiles: dict of athlete profiles
+        with_na: Include swimmers where there are N/A values for
+            weight or height
+        resolver: identity.Resolver object used when there is no exact
+            match
+
+    Returns:
+        data: List of lists with information
+
+    """
+    # Initialize key variables
+    raw_data = list(raw_data)
+    max_bmi = None
+
+    # Get height and weight data
+    values = [
+        _lenex_height_weight(profiles, raw[9], raw[10], raw[11])
+        for raw in raw_data]
+    if resolver is not None:
+        values = [
+            resolver.values(raw[9], raw[10], raw[11])
+            if value is None else value
+            for (raw, value) in zip(raw_data, values)]
+
+    # We've seen errors heights cause very high BMIs.
+    if with_na is False:
+        max_bmi = 30
+
+    # Replace the birthdate with the birthyear
+    data = _join(raw_data, values, with_na, max_bmi=max_bmi)
+    for row in data:
+        row[11] = int(row[11].split('-')[0])
+    return data
+
+
+def _join(raw_data, values, with_na, max_bmi=None):
+    """Add athlete profile data and derived measurements to results.
+
+    Args:
+        raw_data: List of lists of result information without profile data
+        values: List of (height, weight) tuples for each result. None if
+            there is no profile for the athlete
+        with_na: Include swimmers where there are N/A values for
+            weight or height
+        max_bmi: Skip results of athletes with higher BMIs if not None
+
+    Returns:
+        data: List of lists with information
+
+    """
+    # Initialize key variables
+    rows = []
+    heights = []
+    weights = []
+    missing = []
+    data = []
+
+    # Skip results without profiles, ignoring None values they may contain
+    for (raw, value) in zip(raw_data, values):
+        if bool(value) is False:
+            if with_na is False:
+                continue
+            value = (_NA, _NA)
+        if None in raw or None in value:
+            continue
+        rows.append(raw)
+        heights.append(value[0])
+        weights.append(value[1])
+        missing.append(value[0] is _NA)
+
+    # Nothing to do
+    if bool(rows) is False:
+        return data
+
+    # Calculate the measurements of all results at once
+    measurements = metrics.derive(
+        [float(row[5]) for row in rows],
+        [float(row[12]) for row in rows],
+        heights, weights)
+    measurements['speed'][missing] = _NA
+    keep = np.ones(len(rows), dtype=bool)
+    if max_bmi is not None:
+        keep = np.logical_not(measurements['bmi'] > max_bmi)
+    bmi = metrics.rounded(measurements['bmi']).tolist()
+    speed = metrics.rounded(measurements['speed']).tolist()
+    speed_per_kg = metrics.rounded(measurements['speed_per_kg']).tolist()
+
+    # Create list for output
+    for index in np.flatnonzero(keep).tolist():
+        row = rows[index]
+        data.append(
+            row[:12] + [
+                heights[index], weights[index],
+                bmi[index],
+                speed_per_kg[index],
+                speed[index],
+                row[12]])
+    return data
+
+
+def _lenex_height_weight(profiles, firstname, lastname, birthdate):
+    """Get weight and height of athlete.
+
+    Args:
+        profiles: dict of athlete profiles
+        firstname: Athlete first name
+        lastname: Athlete last name
+        birthdate: Athlete birth date
+
+    Returns:
+        data: tuple of (height, weight)
+
+    """
+    # Initialize key variables
+    data = None
+
+    # Get data
+    if lastname in profiles:
+        if firstname in profiles[lastname]:
+            if birthdate in profiles[lastname][firstname]:
+                values = profiles[lastname][firstname][birthdate]
+                height = values['height']
+                weight = values['weight']
+                data = (height, weight)
+
+    return data
+
+
+def _olympics_height_weight(profiles, firstname, lastname):
+    """Get weight and height of athlete.
+
+    Args:
+        profiles: dict of athlete profiles
+        firstname: Athlete first name
+        lastname: Athlete last name
+
+    Returns:
+        data: tuple of (height, weight)
+
+    """
+    # Initialize key variables
+    data = None
+
+    # Get data
+    if lastname in profiles:
+        if firstname in profiles[lastname]:
+            # Just get the first match
+            for birthdate in sorted(profiles[lastname][firstname].keys()):
+                values = profiles[lastname][firstname][birthdate]
+                height = values['height']
+                weight = values['weight']
+                data = (height, weight)
+                break
+
+    return data
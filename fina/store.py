@@ -0,0 +1,319 @@
+"""Module to store swimmer results in an SQLite database."""
+
+# Standard imports
+import os
+import sqlite3
+
+# Fina imports
+from fina import log
+from fina import table
+
+# Database schema. Events repeat the course of their meet so that a single
+# index covers the columns used to select results for a chart
+_SCHEMA = '''
+CREATE TABLE meets (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    city TEXT NOT NULL,
+    nation TEXT NOT NULL,
+    course TEXT NOT NULL);
+
+CREATE TABLE events (
+    id INTEGER PRIMARY KEY,
+    meet_id INTEGER NOT NULL REFERENCES meets(id),
+    number INTEGER NOT NULL,
+    course TEXT NOT NULL,
+    distance REAL NOT NULL,
+    stroke TEXT NOT NULL,
+    round TEXT NOT NULL,
+    gender TEXT NOT NULL);
+
+CREATE TABLE athletes (
+    id INTEGER PRIMARY KEY,
+    firstname TEXT NOT NULL,
+    lastname TEXT NOT NULL,
+    birthyear INTEGER);
+
+CREATE TABLE results (
+    id INTEGER PRIMARY KEY,
+    event_id INTEGER NOT NULL REFERENCES events(id),
+    athlete_id INTEGER NOT NULL REFERENCES athletes(id),
+    height REAL,
+    weight REAL,
+    bmi REAL,
+    speed_per_kg REAL,
+    speed REAL,
+    time REAL NOT NULL);
+
+CREATE TABLE profiles (
+    id INTEGER PRIMARY KEY,
+    firstname TEXT NOT NULL,
+    lastname TEXT NOT NULL,
+    birthdate TEXT NOT NULL,
+    height REAL,
+    weight REAL);
+
+CREATE INDEX events_key ON events (course, stroke, distance, gender);
+CREATE INDEX athletes_identity ON athletes (lastname, firstname, birthyear);
+CREATE INDEX results_event ON results (event_id);
+CREATE INDEX results_athlete ON results (athlete_id);
+CREATE INDEX profiles_identity ON profiles (lastname, firstname, birthdate);
+'''
+
+# Query for results in database file order
+_SELECT = '''
+SELECT
+    meets.name, meets.city, meets.nation, meets.course,
+    events.number, events.distance, events.stroke, events.round,
+    events.gender, athletes.firstname, athletes.lastname, athletes.birthyear,
+    results.height, results.weight, results.bmi, results.speed_per_kg,
+    results.speed, results.time
+FROM results
+    JOIN events ON events.id = results.event_id
+    JOIN meets ON meets.id = events.meet_id
+    JOIN athletes ON athletes.id = results.athlete_id
+{}
+ORDER BY results.id
+'''
+
+
+class Store(object):
+    """SQLite database of meets, events, athletes, results and profiles."""
+
+    def __init__(self, filename):
+        """Method to instantiate the class.
+
+        Args:
+            filename: Name of SQLite file
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._filename = filename
+
+    def write(self, results, profiles):
+        """Replace the contents of the database.
+
+        Args:
+            results: Table object
+            profiles: Dict of profiles keyed by lastname, firstname,
+                birthdate
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        meets = {}
+        events = {}
+        athletes = {}
+        rows = []
+
+        # Create the rows of each table, assigning ids in order of first use
+        for record in results.records():
+            (meet, city, nation, course,
+             number, distance, stroke, _round,
+             gender, firstname, lastname, birthyear) = record[:12]
+            meet_id = meets.setdefault(
+                (meet, city, nation, course), len(meets) + 1)
+            event_id = events.setdefault(
+                (meet_id, number, course, distance, stroke, _round, gender),
+                len(events) + 1)
+            athlete_id = athletes.setdefault(
+                (firstname, lastname, _null(birthyear)), len(athletes) + 1)
+            rows.append(
+                [event_id, athlete_id] + [
+                    _null(value) for value in record[12:]])
+
+        # Write to a temporary file first so the database is never partial
+        tmp_filename = '{}.tmp'.format(self._filename)
+        if os.path.exists(tmp_filename) is True:
+            os.remove(tmp_filename)
+        connection = sqlite3.connect(tmp_filename)
+        with connection:
+            connection.executescript(_SCHEMA)
+            connection.executemany(
+                'INSERT INTO meets VALUES (?, ?, ?, ?, ?)',
+                [(_id,) + key for key, _id in meets.items()])
+            connection.executemany(
+                'INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(_id,) + key for key, _id in events.items()])
+            connection.executemany(
+                'INSERT INTO athletes VALUES (?, ?, ?, ?)',
+                [(_id,) + key for key, _id in athletes.items()])
+            connection.executemany(
+                'INSERT INTO results (event_id, athlete_id, height, weight, '
+                'bmi, speed_per_kg, speed, time) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            connection.executemany(
+                'INSERT INTO profiles (firstname, lastname, birthdate, '
+                'height, weight) VALUES (?, ?, ?, ?, ?)',
+                _profile_rows(profiles))
+        connection.close()
+        os.replace(tmp_filename, self._filename)
+
+    def read(self, course=None, stroke=None, distance=None, gender=None):
+        """Read results with a single query.
+
+        Args:
+            course: Course to filter by
+            stroke: Stroke to filter by
+            distance: Distance in metres to filter by
+            gender: Gender to filter by
+
+        Returns:
+            result: Table object
+
+        """
+        # Initialize key variables
+        conditions = []
+        parameters = []
+
+        # Filter using the index on the events table. Text values are
+        # stored in upper case
+        for (column, value) in [
+                ('events.course', course), ('events.stroke', stroke),
+                ('events.distance', distance), ('events.gender', gender)]:
+            if value is None:
+                continue
+            conditions.append('{} = ?'.format(column))
+            if column == 'events.distance':
+                parameters.append(float(value))
+            else:
+                parameters.append(value.upper())
+        if bool(conditions) is True:
+            where = 'WHERE {}'.format(' AND '.join(conditions))
+        else:
+            where = ''
+
+        # Read data
+        connection = self._connect()
+        with connection:
+            rows = connection.execute(
+                _SELECT.format(where), parameters).fetchall()
+        connection.close()
+
+        result = table.Table.from_rows(rows)
+        return result
+
+    def profiles(self):
+        """Read athlete profiles.
+
+        Args:
+            None
+
+        Returns:
+            data: Dict of profiles keyed by lastname, firstname, birthdate
+
+        """
+        # Initialize key variables
+        data = {}
+
+        # Read data
+        connection = self._connect()
+        with connection:
+            rows = connection.execute(
+                'SELECT firstname, lastname, birthdate, height, weight '
+                'FROM profiles ORDER BY id').fetchall()
+        connection.close()
+
+        for (firstname, lastname, birthdate, height, weight) in rows:
+            data.setdefault(lastname, {}).setdefault(firstname, {})[
+                birthdate] = {'height': height, 'weight': weight}
+        return data
+
+    def _connect(self):
+        """Connect to an existing database.
+
+        Args:
+            None
+
+        Returns:
+            connection: sqlite3 Connection object
+
+        """
+        # Don't create empty databases
+        if os.path.isfile(self._filename) is False:
+            log_message = (
+                'SQLite file {} does not exist'.format(self._filename))
+            log.log2die(1006, log_message)
+        connection = sqlite3.connect(self._filename)
+        return connection
+
+
+def read(filename, course=None):
+    """Read a database file in any format.
+
+    Args:
+        filename: Name of SQLite, NPZ or CSV file
+        course: Course to filter by
+
+    Returns:
+        result: Table object
+
+    """
+    # SQLite files are filtered by course with an indexed query
+    if is_store(filename) is True:
+        result = Store(filename).read(course=course)
+        return result
+
+    # Other formats are filtered by course type as they are read
+    result = table.read(filename, course=course)
+    return result
+
+
+def is_store(filename):
+    """Determine whether a file is an SQLite database.
+
+    Args:
+        filename: Name of file
+
+    Returns:
+        result: True if the filename has an SQLite extension
+
+    """
+    # Return
+    result = filename.lower().endswith(('.sqlite', '.sqlite3', '.db'))
+    return result
+
+
+def _profile_rows(profiles):
+    """Convert profiles to rows of the profiles table.
+
+    Args:
+        profiles: Dict of profiles keyed by lastname, firstname, birthdate
+
+    Returns:
+        data: List of tuples
+
+    """
+    # Initialize key variables
+    data = []
+
+    for lastname, firstnames in profiles.items():
+        for firstname, birthdates in firstnames.items():
+            for birthdate, values in birthdates.items():
+                data.append((
+                    firstname, lastname, birthdate,
+                    values['height'], values['weight']))
+    return data
+
+
+def _null(value):
+    """Convert NaN values to None so they are stored as NULL.
+
+    Args:
+        value: Value
+
+    Returns:
+        result: None for NaN values, otherwise the value
+
+    """
+    # Convert
+    if isinstance(value, float) is True and value != value:
+        result = None
+    else:
+        result = value
+    return result
@@ -0,0 +1,626 @@
+"""Module for columnar tables of swimmer results."""
+
+# Standard imports
+import csv
+import gzip
+
+# pip3 imports
+import numpy as np
+
+# Column names of the database file
+HEADER = [
+    'Meet', 'City', 'Country', 'Course', 'Event ID', 'Distance', 'Stroke',
+    'Round', 'Gender', 'Firstname', 'Lastname', 'Birthyear', 'Height cm',
+    'Weight Kg', 'BMI', 'Speed / Kg', 'Speed m/s', 'Time']
+
+# Table columns in database file order
+COLUMNS = [
+    'meet', 'city', 'nation', 'course', 'event_id', 'distance', 'stroke',
+    'round', 'gender', 'firstname', 'lastname', 'birthyear', 'height',
+    'weight', 'bmi', 'speed_per_kg', 'speed', 'time']
+
+# Columns stored as dictionary encoded strings
+CATEGORICAL = [
+    'meet', 'city', 'nation', 'course', 'stroke', 'round', 'gender',
+    'firstname', 'lastname']
+
+# Columns stored as integers. All others are floats
+INTEGER = ['event_id']
+
+# Float columns written without decimals when they are whole numbers
+WHOLE = ['distance', 'birthyear']
+
+
+class Categorical(object):
+    """Dictionary encoded column of strings."""
+
+    def __init__(self, codes, categories):
+        """Method to instantiate the class.
+
+        Args:
+            codes: Array of indexes into categories
+            categories: List of unique values
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self.codes = np.asarray(codes, dtype=np.int32)
+        self.categories = list(categories)
+
+    @classmethod
+    def from_values(cls, values):
+        """Create a column from a list of values.
+
+        Args:
+            values: List of values
+
+        Returns:
+            result: Categorical object
+
+        """
+        # Initialize key variables. Categories are in order of first use
+        values = list(values)
+        categories = list(dict.fromkeys(values))
+        lookup = {value: code for code, value in enumerate(categories)}
+
+        # Encode
+        codes = np.fromiter(
+            map(lookup.__getitem__, values), dtype=np.int32,
+            count=len(values))
+        result = cls(codes, categories)
+        return result
+
+    @classmethod
+    def concatenate(cls, columns):
+        """Join columns end to end.
+
+        Args:
+            columns: List of Categorical objects
+
+        Returns:
+            result: Categorical object
+
+        """
+        # Initialize key variables
+        lookup = {}
+        codes = []
+
+        # Map the categories of each column to the combined categories
+        for column in columns:
+            mapping = [
+                lookup.setdefault(value, len(lookup))
+                for value in column.categories]
+            codes.append(np.array(mapping, dtype=np.int32)[column.codes])
+
+        if bool(codes) is False:
+            codes.append(np.array([], dtype=np.int32))
+        result = cls(np.concatenate(codes), list(lookup))
+        return result
+
+    def values(self):
+        """Decode the column.
+
+        Args:
+            None
+
+        Returns:
+            data: List of values
+
+        """
+        # Decode
+        categories = self.categories
+        data = [categories[code] for code in self.codes.tolist()]
+        return data
+
+    def take(self, indices):
+        """Select rows of the column.
+
+        Args:
+            indices: Array of row indexes, boolean mask or slice
+
+        Returns:
+            result: Categorical object
+
+        """
+        # Return
+        result = Categorical(self.codes[indices], self.categories)
+        return result
+
+    def __len__(self):
+        """Get the number of rows.
+
+        Args:
+            None
+
+        Returns:
+            result: Number of rows
+
+        """
+        # Return
+        result = len(self.codes)
+        return result
+
+
+class Table(object):
+    """Columnar table of swimmer results.
+
+    Numeric columns are NumPy arrays. String columns are Categorical
+    objects. N/A values are stored as NaN.
+
+    """
+
+    def __init__(self, columns):
+        """Method to instantiate the class.
+
+        Args:
+            columns: Dict of columns keyed by column name
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._columns = {}
+        for name in COLUMNS:
+            self._columns[name] = columns[name]
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Create a table from rows of values in database file order.
+
+        Args:
+            rows: List of lists. Numeric values may be strings
+
+        Returns:
+            result: Table object
+
+        """
+        # Initialize key variables
+        columns = {}
+        values = list(zip(*rows))
+        if bool(values) is False:
+            values = [()] * len(COLUMNS)
+
+        # Convert each column
+        for index, name in enumerate(COLUMNS):
+            if name in CATEGORICAL:
+                columns[name] = Categorical.from_values(values[index])
+            elif name in INTEGER:
+                columns[name] = _numbers(values[index]).astype(np.int64)
+            else:
+                columns[name] = _numbers(values[index])
+
+        result = cls(columns)
+        return result
+
+    @classmethod
+    def concatenate(cls, tables):
+        """Join tables end to end.
+
+        Args:
+            tables: List of Table objects
+
+        Returns:
+            result: Table object
+
+        """
+        # Initialize key variables
+        columns = {}
+        tables = list(tables)
+        if bool(tables) is False:
+            return cls.from_rows([])
+
+        # Join each column
+        for name in COLUMNS:
+            items = [table.column(name) for table in tables]
+            if name in CATEGORICAL:
+                columns[name] = Categorical.concatenate(items)
+            else:
+                columns[name] = np.concatenate(items)
+
+        result = cls(columns)
+        return result
+
+    def column(self, name):
+        """Get a column.
+
+        Args:
+            name: Column name
+
+        Returns:
+            result: NumPy array or Categorical object
+
+        """
+        # Return
+        result = self._columns[name]
+        return result
+
+    def take(self, indices):
+        """Select rows of the table.
+
+        Args:
+            indices: Array of row indexes, boolean mask or slice
+
+        Returns:
+            result: Table object
+
+        """
+        # Initialize key variables
+        columns = {}
+
+        # Select rows
+        for name, column in self._columns.items():
+            if name in CATEGORICAL:
+                columns[name] = column.take(indices)
+            else:
+                columns[name] = column[indices]
+
+        result = Table(columns)
+        return result
+
+    def matching(self, name, value):
+        """Select the rows where a string column has a value.
+
+        Args:
+            name: Name of string column
+            value: Value to match ignoring case
+
+        Returns:
+            result: Table object
+
+        """
+        # Compare each category once
+        column = self._columns[name]
+        codes = [
+            code for code, category in enumerate(column.categories)
+            if category.upper() == value.upper()]
+        result = self.take(np.isin(column.codes, codes))
+        return result
+
+    def distinct(self, names):
+        """Get the distinct combinations of the values of columns.
+
+        Only the codes of string columns and the unique values of numeric
+        columns are compared, so no row is formatted as text.
+
+        Args:
+            names: List of column names
+
+        Returns:
+            data: List of tuples of values formatted as text as by rows
+
+        """
+        # Initialize key variables
+        codes = []
+        labels = []
+
+        # Get the codes and text values of each column
+        for name in names:
+            column = self._columns[name]
+            if name in CATEGORICAL:
+                codes.append(column.codes.astype(np.int64))
+                labels.append(column.categories)
+                continue
+            (values, inverse) = np.unique(column, return_inverse=True)
+            codes.append(inverse.reshape(-1))
+            labels.append(_format(name, values.tolist()))
+
+        # Find the distinct combinations of codes
+        combinations = np.unique(
+            np.stack(codes, axis=1).reshape(-1, len(names)), axis=0)
+        data = [
+            tuple(labels[index][code] for index, code in enumerate(row))
+            for row in combinations.tolist()]
+        return data
+
+    def rows(self):
+        """Get the rows of the table formatted as text.
+
+        Args:
+            None
+
+        Returns:
+            data: List of lists of strings in database file order
+
+        """
+        # Initialize key variables
+        columns = []
+
+        # Format each column
+        for name in COLUMNS:
+            column = self._columns[name]
+            if name in CATEGORICAL:
+                columns.append(column.values())
+            else:
+                columns.append(_format(name, column.tolist()))
+
+        data = [list(row) for row in zip(*columns)]
+        return data
+
+    def records(self):
+        """Get the rows of the table as Python values.
+
+        Args:
+            None
+
+        Returns:
+            data: List of tuples in database file order
+
+        """
+        # Initialize key variables
+        columns = []
+
+        # Decode each column
+        for name in COLUMNS:
+            column = self._columns[name]
+            if name in CATEGORICAL:
+                columns.append(column.values())
+            else:
+                columns.append(column.tolist())
+
+        data = list(zip(*columns))
+        return data
+
+    def __len__(self):
+        """Get the number of rows.
+
+        Args:
+            None
+
+        Returns:
+            result: Number of rows
+
+        """
+        # Return
+        result = len(self._columns['time'])
+        return result
+
+
+def read_csv(filename, delimiter='|', course=None):
+    """Read a database file.
+
+    Args:
+        filename: Name of file
+        delimiter: Column delimiter
+        course: Course to filter by ignoring case. All rows are read if None
+
+    Returns:
+        result: Table object
+
+    """
+    # Read the file skipping the header. The file is read once from start
+    # to finish, so it may also be a pipe or be compressed
+    if filename.lower().endswith('.gz') is True:
+        f_handle = gzip.open(filename, 'rt')
+    else:
+        f_handle = open(filename, 'r')
+    with f_handle:
+        if course is None:
+            reader = csv.reader(f_handle, delimiter=delimiter)
+            next(reader, None)
+        else:
+            # Drop rows of other courses before any values are converted.
+            # Most lines don't need to be parsed to know they can be dropped
+            f_handle.readline()
+            index = COLUMNS.index('course')
+            course = course.upper()
+            reader = (
+                row for row in csv.reader(
+                    _lines(f_handle, course), delimiter=delimiter)
+                if row[index].upper() == course)
+        result = Table.from_rows(reader)
+    return result
+
+
+def write_csv(table, filename, delimiter='|'):
+    """Write a database file.
+
+    Args:
+        table: Table object
+        filename: Name of file
+        delimiter: Column delimiter
+
+    Returns:
+        None
+
+    """
+    # Create output file
+    with open(filename, 'w') as f_handle:
+        writer = csv.writer(f_handle, delimiter=delimiter)
+        writer.writerow(HEADER)
+        writer.writerows(table.rows())
+
+
+def read_npz(filename):
+    """Read a database file stored in the NumPy NPZ format.
+
+    Args:
+        filename: Name of file
+
+    Returns:
+        result: Table object
+
+    """
+    # Initialize key variables
+    columns = {}
+
+    # Read the arrays. Nothing needs to be parsed
+    with np.load(filename) as data:
+        for name in COLUMNS:
+            if name in CATEGORICAL:
+                columns[name] = Categorical(
+                    data['{}.codes'.format(name)],
+                    data['{}.categories'.format(name)].tolist())
+            else:
+                columns[name] = data[name]
+
+    result = Table(columns)
+    return result
+
+
+def write_npz(table, filename):
+    """Write a database file in the NumPy NPZ format.
+
+    Args:
+        table: Table object
+        filename: Name of file
+
+    Returns:
+        None
+
+    """
+    # Initialize key variables
+    arrays = {}
+
+    # String columns are stored as codes and categories
+    for name in COLUMNS:
+        column = table.column(name)
+        if name in CATEGORICAL:
+            arrays['{}.codes'.format(name)] = column.codes
+            arrays['{}.categories'.format(name)] = np.array(
+                column.categories, dtype=str)
+        else:
+            arrays[name] = column
+
+    # Create output file. Use a file handle so that the filename is kept
+    with open(filename, 'wb') as f_handle:
+        np.savez(f_handle, **arrays)
+
+
+def read(filename, course=None):
+    """Read a database file in the format given by its extension.
+
+    Args:
+        filename: Name of file. NPZ files must end with '.npz'
+        course: Course to filter by ignoring case. All rows are read if None
+
+    Returns:
+        result: Table object
+
+    """
+    # Read
+    if filename.lower().endswith('.npz') is True:
+        result = read_npz(filename)
+        if course is not None:
+            result = result.matching('course', course)
+    else:
+        result = read_csv(filename, course=course)
+    return result
+
+
+def _lines(f_handle, text):
+    """Get the lines of a file that may hold a row containing some text.
+
+    Args:
+        f_handle: File handle
+        text: Upper case text
+
+    Returns:
+        output: Generator of lines
+
+    """
+    # Lines without the text can be skipped. A quoted value may span lines
+    # however, so stop skipping once a quote appears
+    quoted = False
+    for line in f_handle:
+        if quoted is False and '"' in line:
+            quoted = True
+        if quoted is True or text in line.upper():
+            yield line
+
+
+def _numbers(values):
+    """Convert values to an array of floats.
+
+    Args:
+        values: List of values
+
+    Returns:
+        result: Array of floats. NaN for None, N/A and blank values
+
+    """
+    # NumPy converts numbers and numeric strings directly. Only convert
+    # each value separately if there are N/A values
+    try:
+        result = np.array(values, dtype=np.float64)
+    except ValueError:
+        result = np.array(
+            [_number(value) for value in values], dtype=np.float64)
+    return result
+
+
+def _format(name, values):
+    """Format the values of a numeric column as text.
+
+    Args:
+        name: Column name
+        values: List of values
+
+    Returns:
+        data: List of strings
+
+    """
+    # Format
+    if name in INTEGER:
+        data = [str(value) for value in values]
+    elif name in WHOLE:
+        data = [_whole(value) for value in values]
+    else:
+        data = [_text(value) for value in values]
+    return data
+
+
+def _number(value):
+    """Convert a value to a float.
+
+    Args:
+        value: Value to convert
+
+    Returns:
+        result: Float. NaN for None, N/A and blank values
+
+    """
+    # Convert
+    if value is None or value in ['N/A', '']:
+        result = np.nan
+    else:
+        result = float(value)
+    return result
+
+
+def _text(value):
+    """Format a float as text.
+
+    Args:
+        value: Float
+
+    Returns:
+        result: Text. N/A for NaN values
+
+    """
+    # Convert
+    if value != value:
+        result = 'N/A'
+    else:
+        result = str(value)
+    return result
+
+
+def _whole(value):
+    """Format a float that is usually a whole number as text.
+
+    Args:
+        value: Float
+
+    Returns:
+        result: Text. Whole numbers have no decimals. N/A for NaN values
+
+    """
+    # Convert
+    if float(value).is_integer() is True:
+        result = str(int(value))
+    else:
+        result = _text(value)
+    return result